@@ -0,0 +1,150 @@
+from Classes.UIHierarchy import UIHierarchy
+from Classes.Screenshot import Screenshot
+from Classes.Fingerprint import Fingerprint
+import hashlib
+import image_processing
+import json
+import os
+import utils
+
+np = utils.lazy_import("numpy")
+Image = utils.lazy_import("PIL.Image")
+
+FORMAT_NAME = "spotit-baseline"
+FORMAT_VERSION = 3
+
+class BaselineArtifacts:
+    """
+    Precompiled baseline stored in a directory:
+    - manifest.json: format version, absolute source paths and their hashes, package, dimension, excluded bounds and fingerprint;
+    - frame.npy: masked RGB frame (height, width, 3);
+    - bounds.npy / parents.npy: pre-order arrays of component bounds (x1, y1, x2, y2) and parent indexes;
+    - components.json: pre-order tag, source line and properties of each component;
+    - analysis.json: Screenshot analysis results of each component (None for components without bounds).
+    """
+
+    @staticmethod
+    def compile(png, xml, package, directory, uihierarchy, dimension, excluded_bounds, image):
+        """
+        Serializes a loaded baseline and analyzes each of its components once.
+
+        :param png: Path of the baseline capture.
+        :param xml: Path of the baseline UI hierarchy dump.
+        :param package: Package of the app under test.
+        :param directory: Directory where the artifacts are written.
+        :param uihierarchy: Parsed UIHierarchy of the baseline.
+        :param dimension: Tuple (width, height) of the baseline document.
+        :param excluded_bounds: List of (component, bounds) not belonging to the package.
+        :param image: Masked PIL Image of the baseline.
+        """
+        os.makedirs(directory, exist_ok=True)
+        if os.path.exists(os.path.join(directory, "manifest.json")):
+            os.remove(os.path.join(directory, "manifest.json"))
+        components = uihierarchy.list_all_components()
+
+        analysis = []
+        for component in components:
+            if not component.bounds:
+                analysis.append(None)
+                continue
+            screenshot = Screenshot(image, component.bounds, component.children)
+            component_analysis = screenshot.getAnalysis()
+            # Text pixels are only compared for components with the same non-empty text; as in the Oracle,
+            # they are read on the component image with its children visible
+            component_analysis["text_pixels"] = None
+            if component.properties.get("text"):
+                text_pixels = image_processing.listTextPixelsFromImage(screenshot.image)
+                component_analysis["text_pixels"] = [sorted(list(pixel) for pixel in word) for word in text_pixels]
+            analysis.append(component_analysis)
+
+        np.save(os.path.join(directory, "frame.npy"), np.asarray(image.convert("RGB")))
+        np.save(os.path.join(directory, "bounds.npy"), np.array(
+            [component.bounds or (-1, -1, -1, -1) for component in components], dtype=np.int32
+        ).reshape(-1, 4))
+        np.save(os.path.join(directory, "parents.npy"), np.array(uihierarchy.parents, dtype=np.int32))
+        BaselineArtifacts._writeJson(directory, "components.json", [
+            {"elementName": component.elementName, "sourceLine": component.sourceLine, "properties": component.properties}
+            for component in components
+        ])
+        BaselineArtifacts._writeJson(directory, "analysis.json", analysis)
+
+        fingerprint = Fingerprint(image, uihierarchy)
+        # The manifest is written last, so an interrupted compilation is never loaded
+        BaselineArtifacts._writeJson(directory, "manifest.json", {
+            "format": FORMAT_NAME,
+            "version": FORMAT_VERSION,
+            "png": os.path.abspath(png),
+            "xml": os.path.abspath(xml),
+            "sources": {"png": BaselineArtifacts._hashFile(png), "xml": BaselineArtifacts._hashFile(xml)},
+            "package": package,
+            "dimension": list(dimension),
+            "excluded_bounds": [list(bounds) for _, bounds in excluded_bounds],
+            "fingerprint": {"pixels": fingerprint.pixels, "hierarchy": fingerprint.hierarchy}
+        })
+
+    @staticmethod
+    def load(directory, package=None):
+        """
+        Loads a compiled baseline. The frame and bounds are memory mapped and the
+        components get their precompiled analysis. Artifacts whose baseline capture or
+        UI hierarchy changed since they were compiled are rejected; a warning is printed
+        for the sources no longer available, which cannot be checked.
+
+        :param directory: Directory of the artifacts.
+        :param package: Package of the app under test, checked against the compiled one when given.
+        :return: Dictionary with the 'uihierarchy', 'dimension', masked 'image' and 'fingerprint'.
+        """
+        manifest_path = os.path.join(directory, "manifest.json")
+        if not os.path.exists(manifest_path):
+            raise FileNotFoundError(f"No compiled baseline found in {directory}")
+        manifest = BaselineArtifacts._readJson(directory, "manifest.json")
+        if manifest.get("format") != FORMAT_NAME or manifest.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported compiled baseline format {manifest.get('format')} v{manifest.get('version')}, please compile it again.")
+        if package and manifest["package"] != package:
+            raise ValueError(f"Compiled baseline is for package {manifest['package']}, not {package}.")
+        for name, digest in manifest["sources"].items():
+            if not os.path.exists(manifest[name]):
+                print(f"\tWarning: {manifest[name]} is not available, the compiled baseline cannot be checked against it.")
+            elif BaselineArtifacts._hashFile(manifest[name]) != digest:
+                raise ValueError(f"Compiled baseline is stale, {manifest[name]} changed since it was compiled. Please compile it again.")
+
+        bounds = np.load(os.path.join(directory, "bounds.npy"), mmap_mode="r")
+        parents = np.load(os.path.join(directory, "parents.npy"), mmap_mode="r")
+        nodes = BaselineArtifacts._readJson(directory, "components.json")
+        uihierarchy = UIHierarchy.from_nodes(manifest["xml"], nodes, parents.tolist(), bounds.tolist())
+        for component, component_analysis in zip(uihierarchy.list_all_components(), BaselineArtifacts._readJson(directory, "analysis.json")):
+            component.analysis = component_analysis
+
+        frame = np.load(os.path.join(directory, "frame.npy"), mmap_mode="r")
+        return {
+            "uihierarchy": uihierarchy,
+            "dimension": tuple(manifest["dimension"]),
+            "image": BaselineArtifacts._wrapFrame(frame),
+            "fingerprint": Fingerprint.from_values(manifest["fingerprint"]["pixels"], manifest["fingerprint"]["hierarchy"]),
+            "manifest": manifest
+        }
+
+    @staticmethod
+    def _wrapFrame(frame):
+        # Builds the RGB image of the memory mapped frame. Image.frombuffer only maps 4 bytes per pixel buffers
+        # into an RGBX image, so the RGB image is a single copy of the frame, read straight from the file
+        return Image.fromarray(np.asarray(frame))
+
+    @staticmethod
+    def _hashFile(filepath, chunk_size=1024 * 1024):
+        # Hashes the content of a source file, so a changed baseline is detected even when its modification time is not
+        digest = hashlib.blake2b(digest_size=16)
+        with open(filepath, "rb") as file:
+            for chunk in iter(lambda: file.read(chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _writeJson(directory, name, content):
+        with open(os.path.join(directory, name), "w", encoding="utf-8") as file:
+            json.dump(content, file)
+
+    @staticmethod
+    def _readJson(directory, name):
+        with open(os.path.join(directory, name), "r", encoding="utf-8") as file:
+            return json.load(file)
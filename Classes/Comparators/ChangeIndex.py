@@ -0,0 +1,140 @@
+from Classes.Comparators.ImageComparison import DIFF_THRESHOLD
+import image_processing
+import utils
+
+cv2 = utils.lazy_import("cv2")
+np = utils.lazy_import("numpy")
+
+class ChangeIndex:
+    def __init__(self, baseline_image, actual_image, diff=None):
+        """
+        Builds summed-area tables (integral images) of the pixels that differ above the diff threshold:
+        between both images, and between each image and white (the color of the masked areas).
+        The changed pixels of any rectangle are then counted with four lookups.
+
+        :param baseline_image: Baseline PIL Image compared at full resolution.
+        :param actual_image: Actual PIL Image compared at full resolution.
+        :param diff: Optional grayscale difference image of both images already computed by an ImageComparison.
+        """
+        baseline_np = np.asarray(baseline_image)
+        actual_np = np.asarray(actual_image)
+        if diff is None:
+            diff = cv2.cvtColor(cv2.absdiff(baseline_np, actual_np), cv2.COLOR_BGR2GRAY)
+        self.size = baseline_image.size
+        self.changed = self._getSummedAreaTable(diff)
+        self.baseline_changed = self._getSummedAreaTable(cv2.cvtColor(255 - baseline_np, cv2.COLOR_BGR2GRAY))
+        self.actual_changed = self._getSummedAreaTable(cv2.cvtColor(255 - actual_np, cv2.COLOR_BGR2GRAY))
+
+    @staticmethod
+    def _getSummedAreaTable(diff):
+        # Table where [y, x] holds the number of changed pixels above and left of (x, y)
+        height, width = diff.shape
+        table = np.zeros((height + 1, width + 1), dtype=np.uint32)
+        np.cumsum(diff > DIFF_THRESHOLD, axis=0, dtype=np.uint32, out=table[1:, 1:])
+        np.cumsum(table[1:, 1:], axis=1, dtype=np.uint32, out=table[1:, 1:])
+        return table
+
+    def _clip(self, bounds):
+        # Clips the bounds (x1, y1, x2, y2), with exclusive ends, to the images
+        width, height = self.size
+        return (max(0, bounds[0]), max(0, bounds[1]), min(width, bounds[2]), min(height, bounds[3]))
+
+    @staticmethod
+    def _intersect(box1, box2):
+        return (max(box1[0], box2[0]), max(box1[1], box2[1]), min(box1[2], box2[2]), min(box1[3], box2[3]))
+
+    @staticmethod
+    def _sum(table, box):
+        # Counts the changed pixels of a box (x1, y1, x2, y2) with exclusive ends
+        x1, y1, x2, y2 = box
+        if x1 >= x2 or y1 >= y2:
+            return 0
+        return int(table[y2, x2]) - int(table[y1, x2]) - int(table[y2, x1]) + int(table[y1, x1])
+
+    def _sumOutside(self, table, box, excluded_boxes):
+        # Counts the changed pixels of a box, except those in the disjoint excluded boxes
+        return self._sum(table, box) - sum(self._sum(table, self._intersect(box, excluded)) for excluded in excluded_boxes)
+
+    def countChanges(self, baseline_bounds, actual_bounds, excluded_bounds=()):
+        """
+        Counts the pixels that differ when two full-size images showing only the given bounds
+        (white elsewhere) are compared, with the excluded bounds masked on both sides.
+
+        :param baseline_bounds: Bounds (x1, y1, x2, y2) visible on the baseline image.
+        :param actual_bounds: Bounds (x1, y1, x2, y2) visible on the actual image.
+        :param excluded_bounds: List of bounds (x1, y1, x2, y2) masked on both images, as by image_processing.addMask.
+        :return: Number of pixels whose difference is above the diff threshold.
+        """
+        baseline_box = self._clip(baseline_bounds)
+        actual_box = self._clip(actual_bounds)
+        both_box = self._intersect(baseline_box, actual_box)
+        excluded_boxes, _ = image_processing.getRectanglesUnion([bounds for bounds in excluded_bounds if bounds], self.size)
+
+        # Where only one side is visible, its pixels are compared with the white of the other side
+        return (
+            self._sumOutside(self.changed, both_box, excluded_boxes)
+            + self._sumOutside(self.baseline_changed, baseline_box, excluded_boxes) - self._sumOutside(self.baseline_changed, both_box, excluded_boxes)
+            + self._sumOutside(self.actual_changed, actual_box, excluded_boxes) - self._sumOutside(self.actual_changed, both_box, excluded_boxes)
+        )
+
+class BandedChangeIndex(ChangeIndex):
+    def __init__(self, baseline_image, actual_image, band_height):
+        """
+        Counts the changed pixels of rectangles as a ChangeIndex, without its full-size tables:
+        the rectangles are compared band by band when first counted, and their count is kept.
+
+        :param baseline_image: Baseline PIL Image compared at full resolution.
+        :param actual_image: Actual PIL Image compared at full resolution.
+        :param band_height: Rows compared at once (see ImageComparison.getBandHeight).
+        """
+        self.baseline = baseline_image
+        self.actual = actual_image
+        self.size = baseline_image.size
+        self.band_height = band_height
+        self.counts = {}
+
+    def countChanges(self, baseline_bounds, actual_bounds, excluded_bounds=()):
+        """
+        Counts the pixels that differ when two full-size images showing only the given bounds
+        (white elsewhere) are compared, with the excluded bounds masked on both sides.
+
+        :param baseline_bounds: Bounds (x1, y1, x2, y2) visible on the baseline image.
+        :param actual_bounds: Bounds (x1, y1, x2, y2) visible on the actual image.
+        :param excluded_bounds: List of bounds (x1, y1, x2, y2) masked on both images, as by image_processing.addMask.
+        :return: Number of pixels whose difference is above the diff threshold.
+        """
+        baseline_box = self._clip(baseline_bounds)
+        actual_box = self._clip(actual_bounds)
+        excluded_boxes, _ = image_processing.getRectanglesUnion([bounds for bounds in excluded_bounds if bounds], self.size)
+        key = (baseline_box, actual_box, tuple(excluded_boxes))
+        if key not in self.counts:
+            self.counts[key] = self._countBands(baseline_box, actual_box, excluded_boxes)
+        return self.counts[key]
+
+    def _countBands(self, baseline_box, actual_box, excluded_boxes):
+        # Outside both boxes both images are white, so only the rows and columns of their union are compared
+        boxes = [box for box in (baseline_box, actual_box) if box[0] < box[2] and box[1] < box[3]]
+        if not boxes:
+            return 0
+        x1, y1 = min(box[0] for box in boxes), min(box[1] for box in boxes)
+        x2, y2 = max(box[2] for box in boxes), max(box[3] for box in boxes)
+        count = 0
+        for top in range(y1, y2, self.band_height):
+            band = (x1, top, x2, min(y2, top + self.band_height))
+            baseline_band = self._getVisibleBand(self.baseline, baseline_box, band, excluded_boxes)
+            actual_band = self._getVisibleBand(self.actual, actual_box, band, excluded_boxes)
+            diff = cv2.cvtColor(cv2.absdiff(baseline_band, actual_band), cv2.COLOR_BGR2GRAY)
+            count += int(np.count_nonzero(diff > DIFF_THRESHOLD))
+        return count
+
+    def _getVisibleBand(self, image, visible_box, band, excluded_boxes):
+        # Gets the RGB pixels of a band of the full-size image showing only the visible box, with the excluded boxes masked
+        pixels = np.full((band[3] - band[1], band[2] - band[0], 3), 255, dtype=np.uint8)
+        x1, y1, x2, y2 = self._intersect(visible_box, band)
+        if x1 < x2 and y1 < y2:
+            pixels[y1 - band[1]:y2 - band[1], x1 - band[0]:x2 - band[0]] = np.asarray(image.crop((x1, y1, x2, y2)).convert("RGB"))
+        for excluded in excluded_boxes:
+            x1, y1, x2, y2 = self._intersect(excluded, band)
+            if x1 < x2 and y1 < y2:
+                pixels[y1 - band[1]:y2 - band[1], x1 - band[0]:x2 - band[0]] = 255
+        return pixels
@@ -1,41 +1,110 @@
-import cv2
-import numpy as np
+import utils
+
+cv2 = utils.lazy_import("cv2")
+np = utils.lazy_import("numpy")
+
+# Min grayscale difference of a pixel to count as a visual change
+DIFF_THRESHOLD = 30
 
 class ImageComparison:
-    def __init__(self, baseline_image, actual_image):
+    def __init__(self, baseline_image, actual_image, cluster_distance=None, uihierarchies=None, pyramid_level=0, band_height=None, previous_boxes=None, dirty_regions=None):
         # Store the baseline and actual images (as PIL Images)
         self.baseline = baseline_image
         self.actual = actual_image
-        self.diff = None  # Will store the grayscale difference image
+        self.cluster_distance = cluster_distance  # Max gap (px) for merging nearby difference boxes, None disables it
+        self.uihierarchies = uihierarchies or []  # UIHierarchies used to group difference boxes by their owning components
+        self.pyramid_level = pyramid_level  # Number of times the difference is halved (max-pooled) before finding its contours
+        self.band_height = band_height  # Rows compared at once in tiled mode, None compares the whole images
+        self.previous_boxes = previous_boxes  # Raw difference boxes of the previous frame pair of a sequence
+        self.dirty_regions = dirty_regions  # Regions (x, y, w, h) changed on either side since the previous frame pair
+        self._diff = None  # Will store the grayscale difference image (built on demand in tiled mode)
+        self.raw_boxes = None  # Will store the bounding boxes of the difference contours, before clustering
         self.boundboxes = None  # Will store bounding boxes around detected differences
-        self.spoted_on_actual = None  # Actual image with difference boxes drawn
-        self.spoted_on_baseline = None  # Baseline image with difference boxes drawn
+
+    @staticmethod
+    def getBandHeight(width, memory_budget):
+        """
+        Computes the rows of a band so the buffers of a tiled comparison fit in the memory budget:
+        both RGB bands, their RGB and grayscale difference, the thresholded mask and
+        the labels of its changed and unchanged areas (23 bytes per pixel).
+
+        :param width: Width of the compared images.
+        :param memory_budget: Memory budget in bytes.
+        :return: Number of rows per band (at least 1).
+        """
+        return max(1, int(memory_budget // (width * 23)))
 
     def areSame(self):
         """
         Compares the baseline and actual images.
         Returns True if no visual differences are detected, False otherwise.
         """
-        # Convert PIL images to NumPy arrays (OpenCV compatible)
-        baseline_image_np = np.array(self.baseline)
-        actual_image_np = np.array(self.actual)
+        if self.previous_boxes is not None and self.dirty_regions is not None and not self.pyramid_level:
+            bounding_boxes = self._getIncrementalBoundingBoxes()
+        elif self.band_height:
+            bounding_boxes = self._getTiledBoundingBoxes()
+        else:
+            # Convert PIL images to NumPy arrays (OpenCV compatible)
+            baseline_image_np = np.array(self.baseline)
+            actual_image_np = np.array(self.actual)
+
+            # Generate difference data
+            self._diff, bounding_boxes = self._getDiffImage(baseline_image_np, actual_image_np)
 
-        # Generate difference data and visualizations
-        self.diff, self.boundboxes, self.spoted_on_actual, self.spoted_on_baseline = self._getDiffImage(
-            baseline_image_np, actual_image_np
-        )
+        # Groups the contour fragments so each box represents a real change
+        self.raw_boxes = bounding_boxes
+        self.boundboxes = self._clusterBoundingBoxes(bounding_boxes)
 
         # Return True only if no bounding boxes (i.e., no visual changes)
         return not self.boundboxes
 
+    @property
+    def diff(self):
+        # Grayscale difference image; in tiled and incremental modes it is only assembled when requested
+        if self._diff is None and self.boundboxes is not None:
+            return self._getTiledDiffImage()
+        return self._diff
+
+    def releaseImages(self):
+        # Drops the difference image once it is no longer needed; the diff property rebuilds it on demand
+        self._diff = None
+
+    @property
+    def spoted_on_actual(self):
+        # Actual image with difference boxes drawn, built on demand so it is only alive while used
+        return self._drawBoundingBoxes(self.actual)
+
+    @property
+    def spoted_on_baseline(self):
+        # Baseline image with difference boxes drawn, built on demand so it is only alive while used
+        return self._drawBoundingBoxes(self.baseline)
+
     def _getDiffImage(self, baseline_image_np, actual_image_np):
         """
         Performs pixel-by-pixel image comparison using OpenCV.
         Returns:
         - grayscale diff image,
-        - bounding boxes around visual differences,
-        - annotated actual image,
-        - annotated baseline image.
+        - bounding boxes around visual differences.
+        """
+        diff, thresholded = self._getThresholdedDiff(baseline_image_np, actual_image_np)
+
+        # Finds contours of the differences (connected components)
+        contours, _ = cv2.findContours(thresholded, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        # Computes bounding boxes around each detected difference contour
+        bounding_boxes = [cv2.boundingRect(contour) for contour in contours]
+        if self.pyramid_level:
+            bounding_boxes = self._scaleToFullResolution(bounding_boxes, baseline_image_np.shape)
+
+        # Returns the diff image and list of bounding boxes
+        return diff, bounding_boxes
+
+    def _getThresholdedDiff(self, baseline_image_np, actual_image_np):
+        """
+        Computes the grayscale difference of the images and its thresholded mask at the pyramid level.
+        Returns:
+        - grayscale diff image,
+        - thresholded mask (255 where the pixels changed).
         """
         # Ensures the images have the same dimensions before comparison
         if baseline_image_np.shape != actual_image_np.shape:
@@ -47,24 +116,247 @@ class ImageComparison:
         # Converts to grayscale to simplify processing
         diff = cv2.cvtColor(diff, cv2.COLOR_BGR2GRAY)
 
-        # Applies threshold to emphasize significant pixel differences
-        _, thresholded = cv2.threshold(diff, 30, 255, cv2.THRESH_BINARY)
+        # Applies threshold to emphasize significant pixel differences, at the pyramid level where the contours are found
+        _, thresholded = cv2.threshold(self._maxPool(diff), DIFF_THRESHOLD, 255, cv2.THRESH_BINARY)
+        return diff, thresholded
 
-        # Finds contours of the differences (connected components)
-        contours, _ = cv2.findContours(thresholded, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    def _maxPool(self, diff):
+        """
+        Downsamples the grayscale difference to the pyramid level, keeping the max of each block of pixels,
+        so even a one pixel wide change keeps its full difference instead of being blurred below the threshold.
+        Returns the downsampled difference (the same array at level 0).
+        """
+        if not self.pyramid_level:
+            return diff
+        factor = 2 ** self.pyramid_level
+        height, width = diff.shape
+        padded = np.zeros((-(-height // factor) * factor, -(-width // factor) * factor), dtype=diff.dtype)
+        padded[:height, :width] = diff
+        return padded.reshape(padded.shape[0] // factor, factor, padded.shape[1] // factor, factor).max(axis=(1, 3))
 
-        # Computes bounding boxes around each detected difference contour
-        bounding_boxes = [cv2.boundingRect(contour) for contour in contours]
+    def _getBands(self):
+        # Yields the (top, bottom) rows of each band, aligned to the pyramid level
+        if self.baseline.size != self.actual.size:
+            raise ValueError("Images must have the same dimensions for pixel-by-pixel comparison")
+        factor = 2 ** self.pyramid_level
+        height = self.baseline.size[1]
+        step = max(1, self.band_height // factor) * factor if self.band_height else height
+        for top in range(0, height, step):
+            yield top, min(height, top + step)
 
-        # Prepares annotated versions of both images (convert to BGR for drawing in OpenCV)
-        baseline_with_boxes = cv2.cvtColor(baseline_image_np, cv2.COLOR_RGB2BGR)
-        actual_with_boxes = cv2.cvtColor(actual_image_np, cv2.COLOR_RGB2BGR)
+    def _getBandArrays(self, top, bottom):
+        # Converts only the rows of a band of both images into NumPy arrays
+        width = self.baseline.size[0]
+        return np.asarray(self.baseline.crop((0, top, width, bottom))), np.asarray(self.actual.crop((0, top, width, bottom)))
 
-        # Draw red rectangles (boxes) around the differences on both images
-        for box in bounding_boxes:
+    def _getTiledBoundingBoxes(self):
+        """
+        Compares the images band by band, so only one band of each buffer is alive at a time.
+        The changed pixels of each band are labelled and joined with the labels they touch in the next band,
+        so the boxes are those findContours finds on the whole difference.
+        Returns the list of bounding boxes as (x, y, w, h).
+        """
+        labels = _BandLabels()
+        for top, bottom in self._getBands():
+            _, thresholded = self._getThresholdedDiff(*self._getBandArrays(top, bottom))
+            labels.addBand(thresholded)
+        bounding_boxes = labels.getOuterBoxes()
+        if self.pyramid_level:
+            bounding_boxes = self._scaleToFullResolution(bounding_boxes, (self.baseline.size[1], self.baseline.size[0]))
+        return bounding_boxes
+
+    def _getIncrementalBoundingBoxes(self):
+        """
+        Updates the difference boxes of the previous frame pair, comparing again only the dirty regions.
+        Outside them neither image changed, so the previous boxes stay valid; the regions first grow over
+        the previous boxes they touch, so no difference contour is split between a region and the rest.
+        Returns the list of bounding boxes as (x, y, w, h).
+        """
+        if self.baseline.size != self.actual.size:
+            raise ValueError("Images must have the same dimensions for pixel-by-pixel comparison")
+        regions = list(self.dirty_regions)
+        kept_boxes = list(self.previous_boxes)
+        while True:
+            # Merges the regions until they are disjoint, so no area is compared twice
+            merged = utils.merge_close_boxes(regions, 0)
+            while len(merged) != len(regions):
+                regions, merged = merged, utils.merge_close_boxes(merged, 0)
+            regions = merged
+            touched = [any(utils.are_boxes_close(box, region, 0) for region in regions) for box in kept_boxes]
+            if not any(touched):
+                break
+            regions += [box for box, is_touched in zip(kept_boxes, touched) if is_touched]
+            kept_boxes = [box for box, is_touched in zip(kept_boxes, touched) if not is_touched]
+
+        bounding_boxes = kept_boxes
+        for x, y, w, h in regions:
+            baseline_region_np = np.asarray(self.baseline.crop((x, y, x + w, y + h)))
+            actual_region_np = np.asarray(self.actual.crop((x, y, x + w, y + h)))
+            _, region_boxes = self._getDiffImage(baseline_region_np, actual_region_np)
+            bounding_boxes += [(box_x + x, box_y + y, box_w, box_h) for box_x, box_y, box_w, box_h in region_boxes]
+        # Follows the order of a full comparison, where the contours are listed in reverse raster order
+        return sorted(bounding_boxes, key=lambda box: (-box[1], -box[0]))
+
+    def _getTiledDiffImage(self):
+        # Assembles the grayscale difference image of all bands
+        bands = [self._getDiffImage(*self._getBandArrays(top, bottom))[0] for top, bottom in self._getBands()]
+        return np.vstack(bands)
+
+    def _drawBoundingBoxes(self, image):
+        # Prepares an annotated version of the image (convert to BGR for drawing in OpenCV)
+        if self.boundboxes is None:
+            return None
+        image_with_boxes = cv2.cvtColor(np.asarray(image), cv2.COLOR_RGB2BGR)
+
+        # Draw red rectangles (boxes) around the differences
+        for box in self.boundboxes:
             x, y, w, h = box
-            cv2.rectangle(actual_with_boxes, (int(x), int(y)), (int(x) + int(w), int(y) + int(h)), (0, 0, 255), 2)
-            cv2.rectangle(baseline_with_boxes, (int(x), int(y)), (int(x) + int(w), int(y) + int(h)), (0, 0, 255), 2)
+            cv2.rectangle(image_with_boxes, (int(x), int(y)), (int(x) + int(w), int(y) + int(h)), (0, 0, 255), 2)
+        return image_with_boxes
+
+    def _scaleToFullResolution(self, bounding_boxes, shape):
+        """
+        Maps the bounding boxes found at the pyramid level back to the compared images,
+        each level pixel covering the block of pixels it was max-pooled from.
+        Returns the list of bounding boxes as (x, y, w, h).
+        """
+        factor = 2 ** self.pyramid_level
+        height, width = shape[0], shape[1]
+        scaled_boxes = []
+        for x, y, w, h in bounding_boxes:
+            x1, y1 = x * factor, y * factor
+            x2, y2 = min(width, (x + w) * factor), min(height, (y + h) * factor)
+            scaled_boxes.append((x1, y1, x2 - x1, y2 - y1))
+        return scaled_boxes
+
+    def _clusterBoundingBoxes(self, bounding_boxes):
+        """
+        Reduces the contour fragments (e.g. from antialiased text) to fewer difference boxes.
+        Boxes closer than cluster_distance are merged, as long as they belong to the
+        same smallest UIComponent in every given UIHierarchy.
+        Returns the list of clustered bounding boxes as (x, y, w, h).
+        """
+        if self.cluster_distance is None:
+            return bounding_boxes
+        if not self.uihierarchies:
+            return utils.merge_close_boxes(bounding_boxes, self.cluster_distance)
+
+        # Boxes of different leaf components are never merged, even when they are close
+        groups = {}
+        for box in bounding_boxes:
+            owners = tuple(self._getLeafOwner(uihierarchy, box) for uihierarchy in self.uihierarchies)
+            groups.setdefault(owners, []).append(box)
+        return [merged_box for boxes in groups.values() for merged_box in utils.merge_close_boxes(boxes, self.cluster_distance)]
+
+    @staticmethod
+    def _getLeafOwner(uihierarchy, box):
+        # Gets the index of the smallest component containing the box, or None when no component contains it
+        owners = uihierarchy.find_components_containing_bounds(box)
+        if not owners:
+            return None
+        leaf = min(owners, key=lambda component: ((component.bounds[2] - component.bounds[0]) * (component.bounds[3] - component.bounds[1]), -component.index))
+        return leaf.index
+
+
+class _BandLabels:
+    """
+    Labels the changed and unchanged areas of a thresholded difference, one band of rows at a time,
+    joining the labels that meet across band borders. As in findContours, changed pixels connect
+    to their 8 neighbours and unchanged pixels to their 4 neighbours.
+    """
+    def __init__(self):
+        self.parents = []  # Union-find over the labels of all bands, changed and unchanged ones alike
+        self.boxes = {}  # Maps each changed label to the (x1, y1, x2, y2) box of its pixels in its band
+        self.starts = {}  # Maps each changed label to its first (y, x) pixel in raster order, where findContours starts its contour
+        self.border_labels = set()  # Labels touching the image border
+        self.neighbours = set()  # (changed label, unchanged label) pairs of 4-neighbour pixels
+        self.last_row = None  # Labels and mask of the last row of the previous band
+        self.height = 0  # Rows labelled so far
+
+    def addBand(self, thresholded):
+        """
+        Labels the next band of the thresholded difference.
+
+        :param thresholded: Mask of the band, 255 where the pixels changed.
+        """
+        changed = thresholded > 0
+        changed_count, changed_labels, stats, _ = cv2.connectedComponentsWithStats(thresholded, connectivity=8)
+        unchanged_count, unchanged_labels = cv2.connectedComponents(cv2.bitwise_not(thresholded), connectivity=4)
+
+        # Numbers the labels after those of the previous bands, changed areas first (label 0 is the other kind of pixel)
+        first = len(self.parents)
+        labels = np.where(changed, changed_labels + (first - 1), unchanged_labels + (first + changed_count - 2))
+        self.parents.extend(range(first, first + changed_count + unchanged_count - 2))
+        for label in range(1, changed_count):
+            x, y, w, h = (int(value) for value in stats[label, :4])
+            self.boxes[first + label - 1] = (x, y + self.height, x + w, y + h + self.height)
+            self.starts[first + label - 1] = (y + self.height, x + int(np.argmax(changed_labels[y, x:x + w] == label)))
+
+        self.border_labels.update(np.unique(labels[:, [0, -1]]).tolist())
+        if self.last_row is None:
+            self.border_labels.update(np.unique(labels[0]).tolist())
+        self._addNeighbours(labels[:, :-1], changed[:, :-1], labels[:, 1:], changed[:, 1:])
+        self._addNeighbours(labels[:-1], changed[:-1], labels[1:], changed[1:])
+
+        if self.last_row is not None:
+            last_labels, last_changed = self.last_row
+            self._addNeighbours(last_labels, last_changed, labels[0], changed[0])
+            # Unchanged areas continue straight across the border, changed areas also diagonally
+            joined = last_changed == changed[0]
+            joined[changed[0]] = False
+            pairs = [np.stack((last_labels[joined], labels[0][joined]), axis=1)]
+            for shift in (-1, 0, 1):
+                above = slice(max(0, -shift), len(last_labels) - max(0, shift))
+                below = slice(max(0, shift), len(last_labels) - max(0, -shift))
+                joined = last_changed[above] & changed[0][below]
+                pairs.append(np.stack((last_labels[above][joined], labels[0][below][joined]), axis=1))
+            for first_label, second_label in np.unique(np.concatenate(pairs), axis=0).tolist():
+                self._union(first_label, second_label)
+
+        self.last_row = labels[-1].copy(), changed[-1].copy()
+        self.height += thresholded.shape[0]
+
+    def getOuterBoxes(self):
+        """
+        Gets the boxes of the changed areas findContours reports as outer contours: those touching the image
+        border or an unchanged area that does, and not lying in a hole of another changed area.
+
+        :return: list of bounding boxes (x, y, w, h), in reverse raster order of their first pixel as findContours lists them.
+        """
+        border_labels = set(self.border_labels)
+        if self.last_row is not None:
+            border_labels.update(np.unique(self.last_row[0]).tolist())
+        outer = {self._find(label) for label in border_labels}
+        outer.update(self._find(changed_label) for changed_label, unchanged_label in self.neighbours if self._find(unchanged_label) in outer)
+
+        # Each outer changed area gets the box of all its parts
+        boxes = {}
+        for label, (x1, y1, x2, y2) in self.boxes.items():
+            root = self._find(label)
+            if root not in outer:
+                continue
+            start = self.starts[label]
+            if root in boxes:
+                left, top, right, bottom, first_start = boxes[root]
+                x1, y1, x2, y2, start = min(x1, left), min(y1, top), max(x2, right), max(y2, bottom), min(start, first_start)
+            boxes[root] = (x1, y1, x2, y2, start)
+        ordered_boxes = sorted(boxes.values(), key=lambda box: box[4], reverse=True)
+        return [(x1, y1, x2 - x1, y2 - y1) for x1, y1, x2, y2, _ in ordered_boxes]
+
+    def _addNeighbours(self, labels, changed, other_labels, other_changed):
+        # Records the changed and unchanged labels of neighbour pixels
+        forward = changed & ~other_changed
+        backward = other_changed & ~changed
+        pairs = np.concatenate((np.stack((labels[forward], other_labels[forward]), axis=1), np.stack((other_labels[backward], labels[backward]), axis=1)))
+        self.neighbours.update(map(tuple, np.unique(pairs, axis=0).tolist()))
+
+    def _find(self, label):
+        while self.parents[label] != label:
+            self.parents[label] = self.parents[self.parents[label]]
+            label = self.parents[label]
+        return label
 
-        # Returns the diff image, list of bounding boxes, and both annotated images
-        return diff, bounding_boxes, actual_with_boxes, baseline_with_boxes
+    def _union(self, first, second):
+        first, second = self._find(first), self._find(second)
+        if first != second:
+            self.parents[max(first, second)] = min(first, second)
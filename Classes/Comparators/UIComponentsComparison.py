@@ -2,8 +2,9 @@ from difflib import SequenceMatcher
 from itertools import product
 
 class UIComponentsComparison():
-    def __init__(self, baseline_uihierarchy, actual_uihierarchy):
+    def __init__(self, baseline_uihierarchy, actual_uihierarchy, score_cache=None):
         # Initializes the UIComponentsComparison object and performs correlation between UI components from the baseline and actual hierarchies
+        self.score_cache = score_cache  # Optional scores of pairs compared before (e.g. in the previous frame of a sequence), by their compared properties
         baseline_uicomponents = baseline_uihierarchy.list_all_components()
         actual_uicomponents = actual_uihierarchy.list_all_components()
         self.correlation = self.establish_correlations(baseline_uicomponents, actual_uicomponents)
@@ -61,19 +62,13 @@ class UIComponentsComparison():
             dict1=b.as_dict()
             dict2=a.as_dict()
 
-            text_sim = self.similarity_score(str(dict1.get('text', '')), str(dict2.get('text', '')))
-            class_sim = self.similarity_score(str(dict1.get('class', '')), str(dict2.get('class', '')))
-            desc_sim = self.similarity_score(str(dict1.get('content-desc', '')), str(dict2.get('content-desc', '')))
-
-            try:
-                bounds1 = eval(dict1['bounds']) if isinstance(dict1['bounds'], str) else dict1['bounds']
-                bounds2 = eval(dict2['bounds']) if isinstance(dict2['bounds'], str) else dict2['bounds']
-                bounds_sim = self.overlap(bounds1, bounds2)
-            except:
-                bounds_sim = 0  # Handle invalid or missing bounds
-
-            # Weighted total score
-            total_score = 0.5 * text_sim + 0.2 * class_sim + 0.2 * desc_sim + 0.1 * bounds_sim
+            if self.score_cache is None:
+                total_score = self.pair_score(dict1, dict2)
+            else:
+                key = (self._score_key(dict1), self._score_key(dict2))
+                total_score = self.score_cache.get(key)
+                if total_score is None:
+                    total_score = self.score_cache[key] = self.pair_score(dict1, dict2)
 
             pairs.append((b, a, total_score))
 
@@ -106,4 +101,32 @@ class UIComponentsComparison():
                 correlation['Unrelated'] = dictionary['line']
                 a.addCorrelation({"UIComponent": "Unrelated", "Score": 0.0})
 
-        return correlation
\ No newline at end of file
+        return correlation
+
+    def _score_key(self, dictionary):
+        # Gets the properties a pair score depends on
+        return (str(dictionary.get('text', '')), str(dictionary.get('class', '')), str(dictionary.get('content-desc', '')), str(dictionary['bounds']))
+
+    def pair_score(self, dict1, dict2):
+        """
+        Computes the weighted similarity score of two UI components.
+
+        :param dict1: Representative properties of the baseline component (see UIComponent.as_dict).
+        :param dict2: Representative properties of the actual component.
+        :return: Float between 0 and 1.
+        """
+        text_sim = self.similarity_score(str(dict1.get('text', '')), str(dict2.get('text', '')))
+        class_sim = self.similarity_score(str(dict1.get('class', '')), str(dict2.get('class', '')))
+        desc_sim = self.similarity_score(str(dict1.get('content-desc', '')), str(dict2.get('content-desc', '')))
+
+        try:
+            bounds1 = eval(dict1['bounds']) if isinstance(dict1['bounds'], str) else dict1['bounds']
+            bounds2 = eval(dict2['bounds']) if isinstance(dict2['bounds'], str) else dict2['bounds']
+            bounds_sim = self.overlap(bounds1, bounds2)
+        except:
+            bounds_sim = 0  # Handle invalid or missing bounds
+
+        # Weighted total score
+        total_score = 0.5 * text_sim + 0.2 * class_sim + 0.2 * desc_sim + 0.1 * bounds_sim
+
+        return total_score
@@ -0,0 +1,78 @@
+import utils
+
+cv2 = utils.lazy_import("cv2")
+np = utils.lazy_import("numpy")
+Image = utils.lazy_import("PIL.Image")
+
+class DensityNormalizer:
+    def __init__(self, baseline_dimension, actual_dimension, min_feature=24, max_level=3):
+        """
+        Maps captures from devices with different densities into a common working resolution.
+        Both sides are scaled uniformly to the narrower screen width, and the shorter one is
+        padded with white so the frames share the same size.
+
+        :param baseline_dimension: Tuple (width, height) of the baseline document.
+        :param actual_dimension: Tuple (width, height) of the actual document.
+        :param min_feature: Min number of pixels the smallest component side must span at the pyramid level.
+        :param max_level: Max number of pyramid levels.
+        """
+        self.width = min(baseline_dimension[0], actual_dimension[0])
+        self.baseline_scale = self.width / baseline_dimension[0]
+        self.actual_scale = self.width / actual_dimension[0]
+        self.height = max(
+            int(round(baseline_dimension[1] * self.baseline_scale)),
+            int(round(actual_dimension[1] * self.actual_scale))
+        )
+        self.min_feature = min_feature
+        self.max_level = max_level
+
+    def getDimension(self):
+        # Gets the common working resolution as (width, height)
+        return (self.width, self.height)
+
+    def normalize(self, image, uihierarchy, scale):
+        """
+        Scales a masked capture and its UIHierarchy bounds into the working resolution, once.
+        The capture keeps its aspect ratio, and is padded with white (or cropped) to the working size.
+
+        :param image: Masked PIL Image of the capture.
+        :param uihierarchy: UIHierarchy of the capture; its component bounds are scaled in place.
+        :param scale: Scale factor of this side (baseline_scale or actual_scale).
+        :return: A new PIL Image with the working resolution.
+        """
+        frame = np.asarray(image)
+        if scale != 1:
+            width, height = int(round(frame.shape[1] * scale)), int(round(frame.shape[0] * scale))
+            frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+            uihierarchy.scale_bounds(scale)
+        working_frame = np.full((self.height, self.width, 3), 255, dtype=np.uint8)
+        rows, columns = min(self.height, frame.shape[0]), min(self.width, frame.shape[1])
+        working_frame[:rows, :columns] = frame[:rows, :columns, :3]
+        return Image.fromarray(working_frame)
+
+    def getPyramidLevel(self, uihierarchies):
+        """
+        Finds the lowest resolution where the smallest component still spans min_feature pixels,
+        so the difference boxes found on the max-pooled difference stay smaller than the components they locate.
+        Only the contours are found at that level: the difference itself is computed at the working resolution,
+        so a change of a single pixel still crosses the threshold. Screens with a component (e.g. an icon)
+        smaller than twice min_feature stay at level 0.
+
+        :param uihierarchies: UIHierarchies already scaled into the working resolution.
+        :return: Number of pyramid levels (0 keeps the working resolution).
+        """
+        sides = [
+            min(component.bounds[2] - component.bounds[0], component.bounds[3] - component.bounds[1])
+            for uihierarchy in uihierarchies
+            for component in uihierarchy.list_all_components()
+            if component.bounds
+        ]
+        sides = [side for side in sides if side > 0]
+        if not sides:
+            return 0
+
+        level = 0
+        smallest_side = min(sides)
+        while level < self.max_level and smallest_side / 2 ** (level + 1) >= self.min_feature:
+            level += 1
+        return level
@@ -0,0 +1,42 @@
+import hashlib
+
+class Fingerprint:
+    def __init__(self, image, uihierarchy):
+        # Computes the fingerprints of a capture: masked app pixels and canonical UI hierarchy
+        self.pixels = self._hash_pixels(image)
+        self.hierarchy = self._hash_hierarchy(uihierarchy)
+
+    @classmethod
+    def from_values(cls, pixels, hierarchy):
+        # Rebuilds a Fingerprint stored by BaselineArtifacts
+        fingerprint = cls.__new__(cls)
+        fingerprint.pixels = pixels
+        fingerprint.hierarchy = hierarchy
+        return fingerprint
+
+    def _hash_pixels(self, image):
+        # Hashes the raw pixel buffer together with its mode and size
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{image.mode}:{image.size}".encode())
+        digest.update(image.tobytes())
+        return digest.hexdigest()
+
+    def _hash_hierarchy(self, uihierarchy):
+        # Hashes the tree in pre-order, with each component's depth, tag and sorted properties
+        digest = hashlib.blake2b(digest_size=16)
+        for component, depth in zip(uihierarchy.list_all_components(), uihierarchy.depths):
+            properties = "\x1f".join(f"{key}={value}" for key, value in sorted(component.properties.items()))
+            digest.update(f"{depth}\x1e{component.elementName}\x1e{properties}\x1d".encode())
+        return digest.hexdigest()
+
+    def key(self):
+        # Identifies the capture by both of its fingerprints
+        return f"{self.pixels}-{self.hierarchy}"
+
+    def __eq__(self, other):
+        if isinstance(other, Fingerprint):
+            return self.pixels == other.pixels and self.hierarchy == other.hierarchy
+        return False
+
+    def __repr__(self):
+        return f"Fingerprint(Pixels: {self.pixels}, Hierarchy: {self.hierarchy})"
@@ -0,0 +1,147 @@
+import hashlib
+import utils
+
+cv2 = utils.lazy_import("cv2")
+np = utils.lazy_import("numpy")
+
+class FrameSequence:
+    def __init__(self, max_dirty_ratio=0.5, region_distance=16):
+        """
+        Carries the analysis of the previous frame pair of a sequence (e.g. a screen transition) into the next one,
+        so each frame pair only analyzes again what changed since the previous frame.
+
+        :param max_dirty_ratio: Max share of a frame that may change before it is compared again from scratch.
+        :param region_distance: Max gap (px) between changed areas analyzed as a single dirty region.
+        """
+        self.max_dirty_ratio = max_dirty_ratio
+        self.region_distance = region_distance
+        self.sides = {"baseline": self._newSide(), "actual": self._newSide()}
+        self.score_cache = {}  # Correlation scores by the compared properties of both components (see UIComponentsComparison)
+        self.previous_boxes = None  # Raw difference boxes of the previous frame pair, None when unknown
+        self.previous_report = None
+        self.previous_output = None  # Folder where the visual reports of the previous frame pair were saved
+        self.dirty_regions = None  # Regions (x, y, w, h) changed on either side since the previous frame, None when unknown
+        self.unchanged = False
+        self.boxes = None
+        self.stats = {}
+
+    @staticmethod
+    def _newSide():
+        # State of one side of the sequence: its last frame and the analysis still valid for it
+        return {"image": None, "uihierarchy": None, "signatures": None, "dirty_regions": None, "analyses": {}}
+
+    def reset(self):
+        # Forgets the previous frames, e.g. after a frame pair that could not be compared
+        self.sides = {"baseline": self._newSide(), "actual": self._newSide()}
+        self.previous_boxes = None
+        self.previous_report = None
+        self.previous_output = None
+
+    def startFrame(self, baseline, actual):
+        """
+        Finds what changed on each side since the previous frame, and drops the analysis it invalidates.
+
+        :param baseline: Dictionary with the baseline 'uihierarchy' and masked 'image' of the frame.
+        :param actual: Dictionary with the actual 'uihierarchy' and masked 'image' of the frame.
+        """
+        hierarchies_unchanged = True
+        dirty_regions = []
+        changed_pixels = 0
+        for name, source in (("baseline", baseline), ("actual", actual)):
+            side = self.sides[name]
+            signatures = self._getSubtreeSignatures(source['uihierarchy'])
+            hierarchies_unchanged = hierarchies_unchanged and side["signatures"] is not None and side["signatures"][:1] == signatures[:1]
+            side_regions, side_pixels = self._getDirtyRegions(side["image"], source['image'])
+            side.update(image=source['image'], uihierarchy=source['uihierarchy'], signatures=signatures, dirty_regions=side_regions)
+
+            # Analysis is only valid while the pixels inside the component bounds do not change
+            if side_regions is None:
+                side["analyses"].clear()
+            else:
+                side["analyses"] = {
+                    signature: (bounds, analysis) for signature, (bounds, analysis) in side["analyses"].items()
+                    if not any(utils.are_boxes_close(utils.convert_bounds_wh(bounds), region, -1) for region in side_regions)
+                }
+            if dirty_regions is not None:
+                dirty_regions = dirty_regions + side_regions if side_regions is not None else None
+            changed_pixels += side_pixels if side_pixels is not None else 0
+
+        self.dirty_regions = dirty_regions if self.previous_boxes is not None else None
+        self.unchanged = self.dirty_regions == [] and hierarchies_unchanged and self.previous_report is not None
+        self.boxes = self.previous_boxes if self.unchanged else None
+        self.stats = {
+            "dirty_regions": len(self.dirty_regions) if self.dirty_regions is not None else None,
+            "changed_pixels": changed_pixels if self.dirty_regions is not None else None,
+            "reused_analyses": 0,
+            "unchanged": self.unchanged
+        }
+
+    def _getDirtyRegions(self, previous_image, image):
+        """
+        Finds the regions where any pixel changed between two consecutive frames of a side.
+
+        :param previous_image: Masked PIL Image of the previous frame, or None.
+        :param image: Masked PIL Image of the frame.
+        :return: Tuple (list of regions as (x, y, w, h), number of changed pixels),
+            or (None, None) when the frame must be analyzed from scratch.
+        """
+        if previous_image is None or previous_image.size != image.size:
+            return None, None
+        changed = np.any(np.asarray(previous_image) != np.asarray(image), axis=2).astype(np.uint8)
+        changed_pixels = int(np.count_nonzero(changed))
+        if changed_pixels > self.max_dirty_ratio * changed.size:
+            return None, None
+        contours, _ = cv2.findContours(changed, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        regions = utils.merge_close_boxes([cv2.boundingRect(contour) for contour in contours], self.region_distance)
+        return regions, changed_pixels
+
+    def _getSubtreeSignatures(self, uihierarchy):
+        # Hashes every subtree (tags, properties and children), so unchanged subtrees are recognized across frames
+        components = uihierarchy.list_all_components()
+        signatures = [None] * len(components)
+        children_digests = [[] for _ in components]
+        for index in range(len(components) - 1, -1, -1):
+            component = components[index]
+            properties = "\x1f".join(f"{key}={value}" for key, value in sorted(component.properties.items()))
+            digest = hashlib.blake2b(f"{component.elementName}\x1e{properties}\x1d".encode(), digest_size=16)
+            for child_digest in reversed(children_digests[index]):
+                digest.update(child_digest)
+            signatures[index] = digest.digest()
+            if uihierarchy.parents[index] >= 0:
+                children_digests[uihierarchy.parents[index]].append(signatures[index])
+        return signatures
+
+    def carryAnalysis(self):
+        """
+        Reuses the analysis of the components whose subtree and pixels did not change since it was computed.
+
+        :return: Set with the ids of the components whose analysis was reused.
+        """
+        reused = set()
+        for side in self.sides.values():
+            for component, signature in zip(side["uihierarchy"].list_all_components(), side["signatures"]):
+                cached = side["analyses"].get(signature)
+                if component.analysis is None and cached and cached[0] == component.bounds:
+                    component.analysis = cached[1]
+                    reused.add(id(component))
+        self.stats["reused_analyses"] = len(reused)
+        return reused
+
+    def setDifferenceBoxes(self, boxes):
+        # Keeps the raw difference boxes of the frame pair, updated incrementally by the next one
+        self.boxes = list(boxes)
+
+    def endFrame(self, report, output=None):
+        """
+        Keeps the results of the frame pair for the next one.
+
+        :param report: Report dictionary of the frame pair.
+        :param output: Optional folder where the visual reports of the frame pair were saved.
+        """
+        self.previous_boxes = self.boxes
+        self.previous_report = report
+        self.previous_output = output
+        for side in self.sides.values():
+            for component, signature in zip(side["uihierarchy"].list_all_components(), side["signatures"]):
+                if component.screenshot and signature not in side["analyses"]:
+                    side["analyses"][signature] = (component.bounds, component.screenshot.getAnalysis())
@@ -0,0 +1,156 @@
+import gc
+import re
+import sys
+import tracemalloc
+import utils
+
+Image = utils.lazy_import("PIL.Image")
+
+try:
+    import resource
+except ImportError:
+    resource = None  # Not available on Windows, where the peak RSS is not reported
+
+MB = 1024 * 1024
+
+class MemoryBudgetExceeded(Exception):
+    def __init__(self, stage, used_rss, budget):
+        # Raised at the end of the first stage whose peak RSS grew over the budget since the comparison started
+        super().__init__(f"Memory budget exceeded in stage '{stage}': peak RSS of {used_rss / MB:.1f} MB over the start of the comparison, {budget / MB:.1f} MB allowed.")
+        self.stage = stage
+
+class MemoryMonitor:
+    def __init__(self, budget_mb=None, trace=False, enabled=True):
+        """
+        Accounts the memory of a comparison stage by stage. The peak resident set size (RSS) of the process
+        is measured for each stage where Linux allows resetting it, and since the process started elsewhere.
+        The budget applies to the growth of the RSS since the monitor was created, so the imported modules
+        and the memory held before the comparison are not charged to it; memory allocated meanwhile by other
+        threads (e.g. a prefetching loader) is. The budget is checked at the end of each stage, so it is not
+        a hard limit: a stage may go over it, and the comparison then stops before the next stage.
+        When tracing, the peak of the Python and NumPy allocations (tracemalloc) and the live PIL image
+        buffers, which tracemalloc does not see, are recorded too; tracing slows the comparison down.
+
+        :param budget_mb: Optional max growth (MB) of the peak RSS during the comparison; the first stage ending over it raises MemoryBudgetExceeded.
+        :param trace: Whether the allocations and the live images of each stage are recorded.
+        :param enabled: Whether the memory is accounted at all; a disabled monitor does nothing.
+        """
+        self.enabled = enabled
+        self.budget = budget_mb * MB if enabled and budget_mb else None
+        self.trace = enabled and trace
+        self.stages = []
+        self.started_tracing = self.trace and not tracemalloc.is_tracing()
+        if self.started_tracing:
+            tracemalloc.start()
+        if enabled:
+            # Images of previous comparisons may only be held by reference cycles (e.g. parent and child components)
+            gc.collect()
+            self._resetPeakRss()
+        # RSS when the comparison starts, or the peak so far where the current RSS is not available
+        self.start_rss = (self.getCurrentRss() or self.getPeakRss() or 0) if enabled else 0
+        self.base = tracemalloc.get_traced_memory()[0] if self.trace else 0
+        if self.trace:
+            tracemalloc.reset_peak()
+
+    @staticmethod
+    def _resetPeakRss():
+        # Resets the peak RSS of the process (Linux only), so it is measured for each stage
+        try:
+            with open("/proc/self/clear_refs", "w") as file:
+                file.write("5")
+        except OSError:
+            pass
+
+    @staticmethod
+    def getCurrentRss():
+        """
+        Gets the current resident set size of the process (Linux only).
+
+        :return: RSS in bytes, or None when it is not available.
+        """
+        try:
+            with open("/proc/self/status", "r") as file:
+                return int(re.search(r"VmRSS:\s+(\d+)", file.read()).group(1)) * 1024
+        except (OSError, AttributeError):
+            return None
+
+    @staticmethod
+    def getPeakRss():
+        """
+        Gets the peak resident set size of the process since it was last reset.
+
+        :return: Peak RSS in bytes, or None when it is not available.
+        """
+        try:
+            with open("/proc/self/status", "r") as file:
+                return int(re.search(r"VmHWM:\s+(\d+)", file.read()).group(1)) * 1024
+        except (OSError, AttributeError):
+            pass
+        if resource:
+            # ru_maxrss is given in bytes on macOS and in KB elsewhere
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return max_rss if sys.platform == "darwin" else max_rss * 1024
+        return None
+
+    @staticmethod
+    def getLiveImages():
+        """
+        Finds the PIL images whose pixel buffers are alive.
+
+        :return: Tuple (number of images, bytes of their buffers).
+        """
+        count, size = 0, 0
+        for obj in gc.get_objects():
+            if isinstance(obj, Image.Image) and getattr(obj, "im", None) is not None:
+                count += 1
+                # PIL stores the pixels of multi-band images in 4 bytes
+                size += obj.width * obj.height * (4 if len(obj.getbands()) > 1 else 1)
+        return count, size
+
+    def endStage(self, name):
+        """
+        Records the memory of the stage that just ended, and starts measuring the next one.
+
+        :param name: Name of the stage.
+        """
+        if not self.enabled:
+            return
+        peak_rss = self.getPeakRss()
+        used_rss = max(0, peak_rss - self.start_rss) if peak_rss is not None else None
+        stage = {
+            "stage": name,
+            "peak_rss_mb": round(peak_rss / MB, 1) if peak_rss is not None else None,
+            "used_rss_mb": round(used_rss / MB, 1) if used_rss is not None else None
+        }
+        if self.trace:
+            _, peak = tracemalloc.get_traced_memory()
+            gc.collect()
+            images, image_bytes = self.getLiveImages()
+            stage.update({
+                "traced_peak_mb": round(max(0, peak - self.base) / MB, 2),
+                "live_images": images,
+                "image_mb": round(image_bytes / MB, 2)
+            })
+        self.stages.append(stage)
+        if self.budget and used_rss is not None and used_rss > self.budget:
+            raise MemoryBudgetExceeded(name, used_rss, self.budget)
+
+        # Objects of the stage only held by reference cycles are released before the next one
+        gc.collect()
+        self._resetPeakRss()
+        if self.trace:
+            tracemalloc.reset_peak()
+
+    def getReport(self):
+        # Gets the budget, the RSS when the comparison started and the memory of each stage
+        return {
+            "budget_mb": round(self.budget / MB, 1) if self.budget else None,
+            "start_rss_mb": round(self.start_rss / MB, 1),
+            "stages": self.stages
+        }
+
+    def close(self):
+        # Stops tracing the allocations, unless tracing was already started by someone else
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
@@ -2,11 +2,13 @@ from Classes.Screenshot import Screenshot
 from Classes.Comparators.ImageComparison import ImageComparison
 
 class Oracle:
-    def __init__(self, baseline, actual, uicomponents_in_difference_zones):
+    def __init__(self, baseline, actual, uicomponents_in_difference_zones, report_writer=None):
         self.baseline = baseline
         self.actual = actual
         self.uicomponents_in_difference_zones = uicomponents_in_difference_zones
+        self.report_writer = report_writer  # Optional ReportWriter receiving each difference when found
         self.tips = []
+        self.differences = []  # Tuples (zone, resource-id, baseline component, actual component, label, description), in finding order
 
     def getTips(self):
         wanted_missing = []
@@ -77,8 +79,8 @@ class Oracle:
 
     def _getScreenshotBasedChanges(self, baseline, actual):
         changes = []
-        baseline_scr = Screenshot(self.baseline["screenshot"].image, baseline.bounds)
-        actual_scr = Screenshot(self.actual["screenshot"].image, actual.bounds)
+        baseline_scr = Screenshot(self.baseline["image"], baseline.bounds, analysis=baseline.analysis, keep_images=False)
+        actual_scr = Screenshot(self.actual["image"], actual.bounds, analysis=actual.analysis, keep_images=False)
 
         baseline_props = baseline_scr.getProperties()
         actual_props = actual_scr.getProperties()
@@ -114,6 +116,7 @@ class Oracle:
             if tip["UI Component on Baseline"] == baseline_component and tip["UI Component on Actual"] == actual_component:
                 if not any(d['Label'] == label for d in tip["Differences"]):
                     tip["Differences"].append({"Label": label, "Description": description})
+                    self._reportDifference(zone, tip, label, description)
                 return
 
         # Determine resource-id
@@ -125,6 +128,13 @@ class Oracle:
             "Difference bounds": zone,
             "Differences": [{"Label": label, "Description": description}]
         })
+        self._reportDifference(zone, self.tips[-1], label, description)
+
+    def _reportDifference(self, zone, tip, label, description):
+        difference = (zone, tip["Resource-id"], tip["UI Component on Baseline"], tip["UI Component on Actual"], label, description)
+        self.differences.append(difference)
+        if self.report_writer:
+            self.report_writer.writeDifference(*difference)
 
     def _getDescription(self, label, baseline, actual, old_value, new_value):
         match label:
@@ -0,0 +1,91 @@
+import json
+import sys
+import utils
+
+cv2 = utils.lazy_import("cv2")
+
+class ReportWriter:
+    def __init__(self, path=None, annotation_compression=1, stream=None):
+        # Streams the findings as JSON Lines into the given file or stream, or stdout when none is given
+        self.stream = open(path, "w", encoding="utf-8") if path else (stream or sys.stdout)
+        self.owns_stream = bool(path)
+        self.annotation_compression = annotation_compression  # PNG compression level (0-9) for the annotated images
+        self.deferred_images = []
+
+    @staticmethod
+    def componentReference(component):
+        # Gets a compact reference to a UIComponent instead of its full properties
+        if component is None or isinstance(component, (str, dict)):
+            return component
+        return {
+            "line": component.sourceLine,
+            "resource-id": component.properties.get("resource-id", "N/A"),
+            "bounds": list(component.bounds) if component.bounds else None
+        }
+
+    def writeRecord(self, record_type, **fields):
+        # Writes a single record as one line and flushes it, so readers can follow the run
+        self.stream.write(json.dumps({"type": record_type, **fields}, separators=(",", ":"), default=str) + "\n")
+        self.stream.flush()
+
+    def writePair(self, baseline, actual):
+        # Writes the sources of the comparison
+        self.writeRecord("pair", baseline=baseline, actual=actual)
+
+    def writeDiffBoxes(self, boundboxes):
+        # Writes each bounding box (x, y, w, h) of the visual differences
+        for box in boundboxes:
+            self.writeRecord("diff_box", bounds=[int(value) for value in box])
+
+    def writeZones(self, uicomponents_in_difference_zones):
+        # Writes the UIComponents affected by each difference zone
+        for zone, sources in uicomponents_in_difference_zones.items():
+            self.writeRecord(
+                "zone", zone=zone,
+                baseline=[self.componentReference(component) for component in sources["baseline"]],
+                actual=[self.componentReference(component) for component in sources["actual"]]
+            )
+
+    def writeDifference(self, zone, resource_id, baseline_component, actual_component, label, description):
+        # Writes a difference as soon as the Oracle classifies it
+        self.writeRecord(
+            "difference", zone=zone, resource_id=resource_id,
+            baseline=self.componentReference(baseline_component),
+            actual=self.componentReference(actual_component),
+            label=label, description=description
+        )
+
+    def writeFindings(self, report):
+        # Writes the findings of a stored report again, with the same records as the comparison that produced it
+        self.writeDiffBoxes(report.get('diff_boxes', []))
+        self.writeZones(report.get('zones', {}))
+        for difference in report.get('differences', []):
+            self.writeDifference(difference['zone'], difference['resource_id'], difference['baseline'], difference['actual'], difference['label'], difference['description'])
+
+    def writeSummary(self, status, **fields):
+        # Writes the outcome of the comparison
+        self.writeRecord("summary", status=status, **fields)
+
+    def deferImage(self, path, image):
+        # Keeps an annotated image (or a function building it) to be saved only after the textual report is complete
+        self.deferred_images.append((path, image))
+
+    def saveDeferredImages(self):
+        # Saves the deferred images with a fast PNG compression, releasing the comparisons they were built from
+        for path, image in self.deferred_images:
+            if callable(image):
+                image = image()
+            cv2.imwrite(path, image, [cv2.IMWRITE_PNG_COMPRESSION, self.annotation_compression])
+        self.deferred_images = []
+
+    def dropDeferredImages(self):
+        # Forgets the deferred images without saving them, e.g. those of a comparison stopped over its memory budget
+        self.deferred_images = []
+
+    def close(self):
+        # Saves the deferred images and closes the report
+        self.saveDeferredImages()
+        if self.owns_stream:
+            self.stream.close()
+        else:
+            self.stream.flush()
@@ -0,0 +1,90 @@
+import hashlib
+import json
+import os
+import shutil
+
+# Version of the stored reports, increased whenever their content changes
+CACHE_FORMAT_VERSION = 3
+
+class ResultCache:
+    def __init__(self, cache_dir, options=None):
+        """
+        Stores comparison reports on disk, one JSON file per pair of fingerprints and comparison options,
+        along with the annotated images of the comparison.
+
+        :param cache_dir: Folder where the reports are stored.
+        :param options: Optional dictionary of the options changing the result of a comparison;
+            reports stored with other options (or by another cache format version) are never reused.
+        """
+        self.cache_dir = cache_dir
+        options_key = json.dumps({"version": CACHE_FORMAT_VERSION, **(options or {})}, sort_keys=True, separators=(",", ":"))
+        self.options_digest = hashlib.blake2b(options_key.encode(), digest_size=8).hexdigest()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, baseline_fingerprint, actual_fingerprint):
+        # Builds the file path of the report related to the pair of fingerprints and the options
+        return os.path.join(self.cache_dir, f"{baseline_fingerprint.key()}_{actual_fingerprint.key()}_{self.options_digest}.json")
+
+    def get(self, baseline_fingerprint, actual_fingerprint):
+        """
+        Retrieves the report previously stored for the pair of fingerprints.
+
+        :param baseline_fingerprint: Fingerprint of the baseline capture.
+        :param actual_fingerprint: Fingerprint of the actual capture.
+        :return: The report dictionary, or None if the pair was never analyzed.
+        """
+        try:
+            with open(self._path(baseline_fingerprint, actual_fingerprint), "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def put(self, baseline_fingerprint, actual_fingerprint, report):
+        """
+        Stores the report of the pair of fingerprints. The file is written atomically,
+        so concurrent runs never read a partial report.
+
+        :param baseline_fingerprint: Fingerprint of the baseline capture.
+        :param actual_fingerprint: Fingerprint of the actual capture.
+        :param report: JSON serializable report dictionary.
+        """
+        path = self._path(baseline_fingerprint, actual_fingerprint)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(report, file)
+        os.replace(temp_path, path)
+
+    def putImages(self, baseline_fingerprint, actual_fingerprint, folder, names):
+        """
+        Stores the annotated images of the pair of fingerprints, copied from the folder where the comparison saved them.
+        Each file is written atomically.
+
+        :param baseline_fingerprint: Fingerprint of the baseline capture.
+        :param actual_fingerprint: Fingerprint of the actual capture.
+        :param folder: Folder holding the images.
+        :param names: File names of the images.
+        """
+        prefix = os.path.splitext(self._path(baseline_fingerprint, actual_fingerprint))[0]
+        for name in names:
+            path = f"{prefix}_{name}"
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            shutil.copyfile(os.path.join(folder, name), temp_path)
+            os.replace(temp_path, path)
+
+    def getImages(self, baseline_fingerprint, actual_fingerprint, folder, names):
+        """
+        Copies the annotated images stored for the pair of fingerprints into a folder.
+
+        :param baseline_fingerprint: Fingerprint of the baseline capture.
+        :param actual_fingerprint: Fingerprint of the actual capture.
+        :param folder: Folder where the images are copied.
+        :param names: File names of the images.
+        :return: True if all the images were stored and copied, False otherwise (nothing is copied).
+        """
+        prefix = os.path.splitext(self._path(baseline_fingerprint, actual_fingerprint))[0]
+        paths = [f"{prefix}_{name}" for name in names]
+        if not all(os.path.isfile(path) for path in paths):
+            return False
+        for name, path in zip(names, paths):
+            shutil.copyfile(path, os.path.join(folder, name))
+        return True
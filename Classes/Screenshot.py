@@ -1,36 +1,112 @@
 import image_processing
 
+# White margin (px) kept around a component in its analysis images, so its edges are found as on the whole capture
+ANALYSIS_MARGIN = 16
+
 class Screenshot:
-    def __init__(self, image, bounds, children=None):
-        self.image = self._highlight_box(image, bounds)
-        self.image_without_children = self._remove_children(children)
-        self.cropped_image = self._crop_image(image, bounds)
-        self.colors = self._extract_colors(bounds)
-        self.position = self._calculate_center(bounds)
-        self.size = self._calculate_size(bounds)
-        self.shape = self._detect_shape()
-        self.text = self._extract_text()
+    def __init__(self, image, bounds, children=None, analysis=None, keep_images=True):
+        self.source = image
+        self.bounds = bounds
+        self.children_bounds = [child.bounds for child in children if child.bounds] if children else []
+        self.keep_images = keep_images  # When False, the images are rebuilt on each use instead of being kept
+        # Region of the capture shown by the analysis images: the component and its margin, within the capture
+        x1, y1, x2, y2 = bounds
+        width, height = image.size
+        self.analysis_box = (max(0, x1 - ANALYSIS_MARGIN), max(0, y1 - ANALYSIS_MARGIN), min(width, x2 + ANALYSIS_MARGIN), min(height, y2 + ANALYSIS_MARGIN))
+        self._image = None
+        self._image_without_children = None
+        self._cropped_image = None
+        self.analysis = analysis  # Precompiled analysis results (see BaselineArtifacts), reused instead of recomputed
+        self._analyzed = bool(analysis)
+        if analysis:
+            self._colors = {tuple(color) for color in analysis["colors"]}
+            self.position = tuple(analysis["position"])
+            self.size = tuple(analysis["size"])
+            self._shape = analysis["shape"]
+            self._text = analysis["text"]
+        else:
+            self.position = self._calculate_center(bounds)
+            self.size = self._calculate_size(bounds)
+
+    def _analyze(self):
+        # Analyzes the images of the component on the first use of the results, so unused components build no image
+        if self._analyzed:
+            return
+        self._colors = self._extract_colors()
+        # The analysis image is built once for the whole analysis, even when it is not kept
+        image = self.image
+        self._shape = self._detect_shape(image)
+        self._text = self._extract_text(self.image_without_children if self.keep_images else self._remove_children(image))
+        self._analyzed = True
+
+    @property
+    def colors(self):
+        self._analyze()
+        return self._colors
+
+    @property
+    def shape(self):
+        self._analyze()
+        return self._shape
+
+    @property
+    def text(self):
+        self._analyze()
+        return self._text
+
+    @property
+    def image(self):
+        # Image of the analysis box where only the component is visible
+        if self._image is not None:
+            return self._image
+        image = self._highlight_box(self.source, self.bounds)
+        if self.keep_images:
+            self._image = image
+        return image
+
+    @property
+    def image_without_children(self):
+        # Image of the analysis box where only the component, without its children, is visible
+        if self._image_without_children is not None:
+            return self._image_without_children
+        image = self._remove_children(self.image)
+        if self.keep_images:
+            self._image_without_children = image
+        return image
+
+    @property
+    def cropped_image(self):
+        # Image of the component bounds
+        if self._cropped_image is not None:
+            return self._cropped_image
+        image = self._crop_image(self.source, self.bounds)
+        if self.keep_images:
+            self._cropped_image = image
+        return image
+
+    def _toAnalysisBox(self, bounds):
+        # Translates bounds of the capture into the analysis box
+        x, y = self.analysis_box[0], self.analysis_box[1]
+        return (bounds[0] - x, bounds[1] - y, bounds[2] - x, bounds[3] - y)
 
     def _highlight_box(self, image, bounds):  
-        # Highlights the bounding box of the component in the image
-        return image_processing.addHighlight(image, [bounds])
+        # Highlights the bounding box of the component in the analysis box of the image
+        return image_processing.addHighlight(image_processing.cropImage(image, self.analysis_box), [self._toAnalysisBox(bounds)])
     
     def _crop_image(self, image, bounds):  
         # Crops the image to the region defined by bounds
         return image_processing.cropImage(image, bounds)
 
-    def _remove_children(self, children):  
+    def _remove_children(self, image):  
         # Masks the image by excluding the areas covered by child components
-        if not children:
-            return self.image
+        if not self.children_bounds:
+            return image
         else:
-            children_bounds = [child.bounds for child in children]
-            return image_processing.addMask(self.image, children_bounds)
+            return image_processing.addMask(image, [self._toAnalysisBox(bounds) for bounds in self.children_bounds])
 
-    def _extract_colors(self, bounds):  
+    def _extract_colors(self):  
         # Extracts the set of dominant colors from the cropped image region
-        cropped = self.image.crop(bounds)
-        return image_processing.getColorsFromImage(cropped)
+        return image_processing.getColorsFromImage(self.cropped_image)
 
     def _calculate_center(self, bounds):  
         # Calculates the center point of the bounding box
@@ -43,16 +119,18 @@ class Screenshot:
         height = bounds[3] - bounds[1]
         return (width, height)
 
-    def _detect_shape(self):  
+    def _detect_shape(self, image):  
         # Identifies the visual shape of the component within its bounds
-        return image_processing.getImageContentShape(self.image)
+        return image_processing.getImageContentShape(image)
 
-    def _extract_text(self):  
+    def _extract_text(self, image_without_children):  
         # Extracts any text content from the image (excluding child areas)
-        return image_processing.getTextFromImage(self.image_without_children)
+        return image_processing.getTextFromImage(image_without_children)
 
     def getTextPixels(self):  
         # Returns the list of pixel coordinates corresponding to text regions
+        if self.analysis and self.analysis.get("text_pixels") is not None:
+            return [{tuple(pixel) for pixel in word} for word in self.analysis["text_pixels"]]
         return image_processing.listTextPixelsFromImage(self.image_without_children) 
 
     def getProperties(self):  
@@ -63,3 +141,13 @@ class Screenshot:
             "Size": self.size,
             "Shape": self.shape
         }
+
+    def getAnalysis(self):
+        # Returns the JSON serializable analysis results, as stored in BaselineArtifacts
+        return {
+            "colors": sorted(list(color) for color in self.colors),
+            "position": list(self.position),
+            "size": list(self.size),
+            "shape": self.shape,
+            "text": self.text
+        }
@@ -8,9 +8,11 @@ class UIComponent:
         self.properties = properties  # Dictionary of attributes
         self.parent = parent  # Reference to parent UIComponent
         self.children = []  # List of child UIComponents
+        self.index = None  # Position in the pre-order index of its UIHierarchy
         self.bounds = self._get_bounds()
         self.screenshot = None
         self.correlation = None
+        self.analysis = None  # Precompiled Screenshot analysis of a compiled baseline
 
     def _get_bounds(self):
         # Parses the bounds property and convert it to the format (x1, y1, x2, y2)
@@ -23,10 +25,10 @@ class UIComponent:
         # Adds the corresponding component from the other source (baseline/actual)
         self.correlation = correlation
 
-    def addScreenshot(self, image):
+    def addScreenshot(self, image, keep_images=True):
         # Adds image representation for this component
         if self.bounds:
-            self.screenshot = Screenshot(image, self.bounds, self.children)
+            self.screenshot = Screenshot(image, self.bounds, self.children, self.analysis, keep_images)
 
     def add_child(self, child):
         # Adds a child UIComponent to this component
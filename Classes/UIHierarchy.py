@@ -1,14 +1,41 @@
+from itertools import accumulate
 import xml.dom.minidom
 from Classes.UIComponent import UIComponent
 import utils
-from PyQt5.QtXml import QDomDocument
-from PyQt5.QtCore import QFile, QIODevice
+
+QtXml = utils.lazy_import("PyQt5.QtXml")
 
 class UIHierarchy:
     def __init__(self, file_path):
         # Initializes the UIHierarchy by parsing the given XML file and building a UI component tree.
         self.file_path = file_path
         self.root_component = self._parse_xml_to_objects()
+        self._build_index()
+
+    @classmethod
+    def from_nodes(cls, file_path, nodes, parents, bounds):
+        """
+        Rebuilds a UIHierarchy from its flattened pre-order form, without parsing XML.
+
+        :param file_path: Path of the XML file the nodes come from.
+        :param nodes: List of dicts with the 'elementName', 'sourceLine' and 'properties' of each component.
+        :param parents: Sequence with the index of each component's parent (-1 for the root).
+        :param bounds: Sequence of (x1, y1, x2, y2) per component, with negative values for no bounds.
+        :return: UIHierarchy instance.
+        """
+        uihierarchy = cls.__new__(cls)
+        uihierarchy.file_path = file_path
+        components = []
+        for node, parent_index, node_bounds in zip(nodes, parents, bounds):
+            parent = components[parent_index] if parent_index >= 0 else None
+            component = UIComponent(node["elementName"], node["sourceLine"], node["properties"], parent)
+            component.bounds = tuple(int(value) for value in node_bounds) if node_bounds[0] >= 0 else None
+            if parent:
+                parent.add_child(component)
+            components.append(component)
+        uihierarchy.root_component = components[0] if components else None
+        uihierarchy._build_index()
+        return uihierarchy
 
     def _parse_xml_to_objects(self):
         """
@@ -23,22 +50,14 @@ class UIHierarchy:
             print("\tDetected single-line XML, applying pretty-printing...")
             raw_xml = self._pretty_format_xml(raw_xml)
 
-        temp_file_path = f"output/temp_formatted_{self.file_path.split('/')[-1]}"
-        with open(temp_file_path, "w", encoding="utf-8") as temp_file:
-            temp_file.write(raw_xml)
-
-        file = QFile(temp_file_path)
-        if not file.open(QIODevice.ReadOnly | QIODevice.Text):
-            raise FileNotFoundError(f"Failed to open file: {temp_file_path}")
+        # Parses from memory, so concurrent loaders never share a temporary file
+        doc = QtXml.QDomDocument()
+        parsed, error_message, error_line, _ = doc.setContent(raw_xml)
+        if not parsed:
+            raise ValueError(f"Failed to parse XML: {error_message} (line {error_line}).")
 
-        doc = QDomDocument()
-        if not doc.setContent(file):
-            file.close()
-            raise ValueError("Failed to parse XML.")
-
-        file.close()
         root_element = doc.documentElement()
-        return self._build_component_tree(root_element, None)
+        return self._build_component_tree(root_element)
 
     def _pretty_format_xml(self, xml_str):
         """
@@ -50,33 +69,68 @@ class UIHierarchy:
         dom = xml.dom.minidom.parseString(xml_str)
         return dom.toprettyxml(indent="  ")
 
-    def _build_component_tree(self, element, parent_component):
+    def _build_component_tree(self, root_element):
         """
-        Recursively builds a tree of UIComponent objects from QDom elements.
+        Builds a tree of UIComponent objects from QDom elements.
+        Walks the elements with an explicit stack, so deep hierarchies (e.g. WebViews) never hit the recursion limit.
 
-        :param element: Current XML element being processed.
-        :param parent_component: Parent UIComponent object.
-        :return: Root UIComponent (only at the top call).
+        :param root_element: Root XML element of the document.
+        :return: Root UIComponent.
         """
-        if element.isNull():
+        if root_element.isNull():
             return None
 
-        element_name = element.tagName()
-        line_number = element.lineNumber()
-        properties = self._get_attributes_dict(element)
-        component = UIComponent(element_name, line_number, properties, parent_component)
-
-        if parent_component:
-            parent_component.add_child(component)
-
-        child = element.firstChild()
-        while not child.isNull():
-            child_element = child.toElement()
-            if not child_element.isNull():
-                self._build_component_tree(child_element, component)
-            child = child.nextSibling()
-
-        return component if not parent_component else None
+        root_component = None
+        stack = [(root_element, None)]
+        while stack:
+            element, parent_component = stack.pop()
+            properties = self._get_attributes_dict(element)
+            component = UIComponent(element.tagName(), element.lineNumber(), properties, parent_component)
+            if parent_component:
+                parent_component.add_child(component)
+            else:
+                root_component = component
+
+            child_elements = []
+            child = element.firstChild()
+            while not child.isNull():
+                child_element = child.toElement()
+                if not child_element.isNull():
+                    child_elements.append(child_element)
+                child = child.nextSibling()
+            # Reversed, so the children are popped (and added) in document order
+            stack.extend((child_element, component) for child_element in reversed(child_elements))
+
+        return root_component
+
+    def _build_index(self):
+        """
+        Flattens the tree once into a pre-order index, so the traversals become lookups or slices.
+        For the component at position i: depths[i], parents[i] (-1 for the root), packages[i],
+        and its subtree spans the positions [i, subtree_ends[i]).
+        """
+        self.components = []
+        self.depths = []
+        self.parents = []
+        self.packages = []
+        stack = [(self.root_component, -1, 0)] if self.root_component else []
+        while stack:
+            component, parent_index, depth = stack.pop()
+            component.index = len(self.components)
+            self.components.append(component)
+            self.depths.append(depth)
+            self.parents.append(parent_index)
+            self.packages.append(component.properties.get("package"))
+            stack.extend((child, component.index, depth + 1) for child in reversed(component.children))
+
+        # In pre-order a subtree ends where the subtree of its last descendant ends
+        self.subtree_ends = list(range(1, len(self.components) + 1))
+        for index in range(len(self.components) - 1, 0, -1):
+            parent_index = self.parents[index]
+            self.subtree_ends[parent_index] = max(self.subtree_ends[parent_index], self.subtree_ends[index])
+
+        bounds = [component.bounds for component in self.components if component.bounds]
+        self.dimensions = (max((b[2] for b in bounds), default=0), max((b[3] for b in bounds), default=0))
 
     def _get_attributes_dict(self, element):
         """
@@ -94,25 +148,21 @@ class UIHierarchy:
 
     def list_all_components(self):
         """
-        Collects and returns a flat list of all UIComponent objects in the hierarchy.
+        Returns the flat pre-order list of all UIComponent objects in the hierarchy.
+        The list is shared by every caller, so it must not be modified.
 
         :return: List of UIComponent objects.
         """
-        all_components = []
-        self._collect_components(self.root_component, all_components)
-        return all_components
+        return self.components
 
-    def _collect_components(self, component, all_components):
+    def get_subtree(self, component):
         """
-        Recursively traverses the component tree and collects all components.
+        Returns a component and all its descendants.
 
-        :param component: Current component being traversed.
-        :param all_components: List to store collected components.
+        :param component: UIComponent of this hierarchy.
+        :return: List of UIComponent objects, in pre-order.
         """
-        if component:
-            all_components.append(component)
-            for child in component.children:
-                self._collect_components(child, all_components)
+        return self.components[component.index:self.subtree_ends[component.index]]
 
     def get_document_dimensions(self):
         """
@@ -120,34 +170,7 @@ class UIHierarchy:
 
         :return: Tuple (max_x, max_y) representing screen dimensions.
         """
-        max_x, max_y = self._calculate_document_dimensions(self.root_component)
-        return max_x, max_y
-
-    def _calculate_document_dimensions(self, component):
-        """
-        Recursively finds the furthest (x2, y2) point across all bounds.
-
-        :param component: Current UIComponent being analyzed.
-        :return: Tuple (max_x, max_y) for this subtree.
-        """
-        max_x, max_y = 0, 0
-
-        if component:
-            bounds = component.properties.get("bounds")
-            if bounds:
-                try:
-                    _, _, x2, y2 = utils.parse_bounds_str(bounds)
-                    max_x = max(max_x, x2)
-                    max_y = max(max_y, y2)
-                except ValueError:
-                    pass
-
-            for child in component.children:
-                child_max_x, child_max_y = self._calculate_document_dimensions(child)
-                max_x = max(max_x, child_max_x)
-                max_y = max(max_y, child_max_y)
-
-        return max_x, max_y
+        return self.dimensions
 
     def get_bounds_excluding_package(self, package_name):
         """
@@ -156,27 +179,37 @@ class UIHierarchy:
         :param package_name: Package name to exclude from results.
         :return: List of tuples (component, bounds).
         """
-        excluded_bounds = []
-        self._collect_bounds_excluding_package(self.root_component, package_name, excluded_bounds)
-        return excluded_bounds
+        return [
+            (component, component.bounds)
+            for component, package in zip(self.components, self.packages)
+            if package != package_name and component.bounds
+        ]
 
-    def _collect_bounds_excluding_package(self, component, package_name, excluded_bounds):
+    def get_package_rows(self, package_name):
         """
-        Recursively collects bounds of components that do not belong to the target package.
+        Computes the range of rows covered by the components of the given package.
 
-        :param component: Current component being evaluated.
-        :param package_name: Package name to exclude.
-        :param excluded_bounds: List to accumulate excluded bounds.
+        :param package_name: Package name of the app.
+        :return: Tuple (y1, y2), or None if no component belongs to the package.
         """
-        if component:
-            component_package = component.properties.get("package")
-            if component_package != package_name:
-                bounds = component.properties.get("bounds")
-                if bounds:
-                    excluded_bounds.append((component, utils.parse_bounds_str(bounds)))
+        rows = [component.bounds for component, package in zip(self.components, self.packages)
+                if component.bounds and package == package_name]
+        if not rows:
+            return None
+        return min(bounds[1] for bounds in rows), max(bounds[3] for bounds in rows)
+
+    def scale_bounds(self, factor):
+        """
+        Scales the parsed bounds of every component, e.g. into a common working resolution.
+        The 'bounds' property keeps the value from the XML.
 
-            for child in component.children:
-                self._collect_bounds_excluding_package(child, package_name, excluded_bounds)
+        :param factor: Scale factor applied to every coordinate.
+        """
+        for component in self.components:
+            if component.bounds:
+                component.bounds = tuple(int(round(value * factor)) for value in component.bounds)
+                # Precompiled analysis no longer matches the scaled bounds
+                component.analysis = None
 
     def find_components_containing_bounds(self, boundbox):
         """
@@ -185,36 +218,11 @@ class UIHierarchy:
         :param boundbox: Tuple (x, y, width, height) representing a visual change region.
         :return: List of UIComponents that contain the region.
         """
-        return self._search_containing_components(self.root_component, boundbox[0], boundbox[1], boundbox[2], boundbox[3])
-
-    def _search_containing_components(self, component, x, y, w, h):
-        """
-        Recursively checks whether the given bounding box is contained in a component,
-        and collects the smallest matching components.
-
-        :param component: UIComponent to check containment.
-        :param x: Top-left x of bounding box.
-        :param y: Top-left y of bounding box.
-        :param w: Width of bounding box.
-        :param h: Height of bounding box.
-        :return: List of components that contain the box.
-        """
-        if not component:
-            return []
-
-        matching_components = []
-
-        if component.bounds and utils.is_contained((x, y, x+w, y+h), component.bounds):
-            children_matches = []
-            for child in component.children:
-                child_results = self._search_containing_components(child, x, y, w, h)
-                children_matches.extend(child_results)
-
-            if children_matches:
-                return children_matches + matching_components
-            matching_components.append(component)
-
-        for child in component.children:
-            matching_components.extend(self._search_containing_components(child, x, y, w, h))
-
-        return matching_components
+        x, y, w, h = boundbox
+        contains = [bool(component.bounds) and utils.is_contained((x, y, x + w, y + h), component.bounds) for component in self.components]
+        # Number of containing components before each position, to count the containing descendants of a subtree
+        counts = list(accumulate(contains, initial=0))
+        return [
+            component for index, component in enumerate(self.components)
+            if contains[index] and counts[self.subtree_ends[index]] == counts[index + 1]
+        ]
@@ -0,0 +1,219 @@
+from Classes.ReportWriter import ReportWriter
+import argparse
+import hashlib
+import json
+import os
+import queue
+import re
+import sys
+import threading
+import time
+import main
+
+def readManifest(filepath):
+    """
+    Reads the comparison jobs of a batch run.
+    Each non-empty line of the manifest is a JSON object with 'baseline_png', 'baseline_xml',
+    'actual_png' and 'actual_xml', and optionally 'id', 'app_package' and 'output'.
+    A compiled baseline can be given by 'baseline_artifacts' instead of 'baseline_png' and 'baseline_xml'.
+
+    :param filepath: Path of the JSON Lines manifest.
+    :return: List of job dictionaries.
+    """
+    jobs = []
+    with open(filepath, "r", encoding="utf-8") as file:
+        for line in file:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                jobs.append(json.loads(line))
+    return jobs
+
+def numberJobs(jobs):
+    """
+    Gives each job without 'id' the id 'job-<n>' of its position in the manifest, so identical jobs
+    keep their own result and output folder, and every runner of the manifest gives them the same id.
+
+    :param jobs: List of job dictionaries, in manifest order.
+    :return: List of job dictionaries, all with an 'id'.
+    """
+    return [job if 'id' in job else {'id': f"job-{position + 1}", **job} for position, job in enumerate(jobs)]
+
+def jobKey(job):
+    # Identifies a job by its id (see numberJobs)
+    return str(job['id'])
+
+def parseShard(shard):
+    """
+    Parses a shard given as 'i/N', with 1 <= i <= N.
+
+    :param shard: Shard string.
+    :return: Tuple (i, N).
+    """
+    try:
+        index, count = (int(value) for value in shard.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid shard '{shard}', expected i/N")
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"Invalid shard '{shard}', expected 1 <= i <= N")
+    return index, count
+
+def selectShard(jobs, index, count):
+    """
+    Keeps the jobs of a shard. Jobs are assigned by a hash of their key, so every runner
+    computes the same partition regardless of the Python hash seed, and of the manifest order
+    for the jobs with their own id.
+
+    :param jobs: List of job dictionaries with an 'id' (see numberJobs).
+    :param index: Shard number, from 1 to count.
+    :param count: Number of shards.
+    :return: List of the jobs belonging to the shard, in manifest order.
+    """
+    return [
+        job for job in jobs
+        if int(hashlib.sha1(jobKey(job).encode("utf-8")).hexdigest(), 16) % count == index - 1
+    ]
+
+def jobOutput(job, args):
+    # Gets the folder of a job's visual reports: its own 'output', or a subfolder of the batch output named after the job
+    if 'output' in job:
+        return job['output']
+    return os.path.join(args.output, re.sub(r"[^\w.-]", "_", jobKey(job)))
+
+def jobArguments(job, args):
+    # Builds the arguments of a single comparison from the job and the batch defaults
+    return argparse.Namespace(
+        baseline_png=job.get('baseline_png', '-'),
+        baseline_xml=job.get('baseline_xml', '-'),
+        baseline_artifacts=job.get('baseline_artifacts'),
+        actual_png=job['actual_png'],
+        actual_xml=job['actual_xml'],
+        app_package=job.get('app_package', args.app_package),
+        output=jobOutput(job, args),
+        cluster_distance=args.cluster_distance,
+        cache_dir=args.cache_dir,
+        app_rows_only=args.app_rows_only,
+        no_annotations=args.no_annotations,
+        cross_density=args.cross_density,
+        min_feature=args.min_feature,
+        tile_memory_mb=args.tile_memory_mb,
+        memory_report=args.memory_report,
+        memory_budget_mb=args.memory_budget_mb,
+        report=None
+    )
+
+class PrefetchLoader:
+    def __init__(self, jobs_arguments, prefetch=2):
+        # Loads the next pairs in a background thread while the current pair is compared.
+        # The bounded queue blocks the loader once 'prefetch' pairs are waiting, so memory stays bounded.
+        self.jobs_arguments = jobs_arguments
+        self.queue = queue.Queue(maxsize=max(1, prefetch))
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._load, daemon=True)
+
+    def _load(self):
+        # Loads each pair and hands it to the consumer, keeping the loading errors with their job
+        for job_arguments in self.jobs_arguments:
+            if self.stopped.is_set():
+                return
+            started = time.perf_counter()
+            try:
+                sources, error = main.loadSources(job_arguments), None
+            except Exception as exception:
+                sources, error = None, exception
+            if not self._put((job_arguments, sources, error, time.perf_counter() - started)):
+                return
+        self._put(None)
+
+    def _put(self, item):
+        # Waits for room in the queue unless the consumer stopped iterating
+        while not self.stopped.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def __iter__(self):
+        """
+        Iterates over the loaded pairs in manifest order.
+
+        :return: Iterator of tuples (job arguments, (baseline, actual) or None, loading error or None, loading seconds).
+        """
+        self.thread.start()
+        try:
+            while True:
+                item = self.queue.get()
+                if item is None:
+                    return
+                yield item
+        finally:
+            self.stopped.set()
+
+def runBatch(jobs, args, report_writer=None):
+    """
+    Compares every pair of the batch, prefetching the next pairs while the current one is analyzed.
+
+    :param jobs: List of job dictionaries with an 'id' (see numberJobs).
+    :param args: Batch arguments with the defaults of each comparison.
+    :param report_writer: Optional ReportWriter streaming the findings of all pairs.
+    :return: List of result dictionaries, one per job, with its status and timings.
+    """
+    results = []
+    jobs_arguments = [jobArguments(job, args) for job in jobs]
+    for index, (job_arguments, sources, error, load_seconds) in enumerate(PrefetchLoader(jobs_arguments, args.prefetch)):
+        job_id = jobKey(jobs[index])
+        started = time.perf_counter()
+        if error:
+            status = "ERROR"
+            print(f"\n{job_id}: failed to load the pair: {error}")
+        else:
+            try:
+                os.makedirs(job_arguments.output, exist_ok=True)
+                report = main.comparePair(job_arguments, *sources, report_writer)
+                status = report['status'] if report else "NO_PACKAGE"
+            except Exception as exception:
+                status, error = "ERROR", exception
+                print(f"\n{job_id}: failed to compare the pair: {error}")
+        result = {
+            "id": job_id,
+            "status": status,
+            "error": str(error) if error else None,
+            "load_seconds": round(load_seconds, 4),
+            "compare_seconds": round(time.perf_counter() - started, 4)
+        }
+        if report_writer:
+            report_writer.writeRecord("result", **result)
+        results.append(result)
+    return results
+
+def parseArguments(argv):
+    parser = argparse.ArgumentParser(description="Runs the SpotIt comparison of every pair listed in a manifest.", parents=[main.comparisonParser(), main.pairParser()])
+    parser.add_argument("manifest", help="JSON Lines file listing the pairs to compare.")
+    parser.add_argument("--app-package", default=None, help="Package of the app under test, unless given by the job.")
+    parser.add_argument("--output", default="output", help="Folder where the visual reports of each job are saved in a subfolder, unless given by the job.")
+    parser.add_argument("--prefetch", type=int, default=2, help="Max number of loaded pairs waiting to be compared.")
+    parser.add_argument("--shard", type=parseShard, default=None, help="Run only the shard i/N of the manifest (1 <= i <= N).")
+    parser.add_argument("--report", default=None, help="JSON Lines file where the findings are streamed (defaults to shard-i-of-N.jsonl when sharding).")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parseArguments(sys.argv[1:])
+    jobs = numberJobs(readManifest(args.manifest))
+    if args.shard:
+        shard_index, shard_count = args.shard
+        jobs = selectShard(jobs, shard_index, shard_count)
+        args.report = args.report or f"shard-{shard_index}-of-{shard_count}.jsonl"
+
+    report_writer = ReportWriter(args.report) if args.report else None
+    started = time.perf_counter()
+    try:
+        if report_writer and args.shard:
+            report_writer.writeRecord("shard", shard=shard_index, shards=shard_count, manifest=args.manifest, jobs=len(jobs))
+        results = runBatch(jobs, args, report_writer)
+        if report_writer and args.shard:
+            report_writer.writeRecord("shard_summary", shard=shard_index, shards=shard_count, wall_seconds=round(time.perf_counter() - started, 4))
+    finally:
+        if report_writer:
+            report_writer.close()
+    print(f"\n{sum(result['status'] == 'PASSED' for result in results)}/{len(results)} pairs PASSED.")
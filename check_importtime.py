@@ -0,0 +1,63 @@
+import argparse
+import subprocess
+import sys
+
+# Dependencies that must only be imported by the code paths needing them
+HEAVY_MODULES = {"cv2", "numpy", "PIL", "PyQt5", "pytesseract", "PyShapes"}
+
+# Command line entry points checked by default (the daemon pays its imports once)
+ENTRY_POINTS = ["main", "batch", "sequence"]
+
+def measureImport(module):
+    """
+    Imports the module in a fresh interpreter with '-X importtime'.
+
+    :param module: Name of the module to import.
+    :return: Tuple (cumulative import time in ms, set of the imported top-level packages).
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True
+    )
+    cumulative_us = 0
+    imported = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        imported.add(name.strip().split(".")[0])
+        if name.strip() == module:
+            cumulative_us = int(cumulative)
+    return cumulative_us / 1000, imported
+
+def checkImports(modules, budget_ms):
+    """
+    Verifies that the modules load no heavy dependency and import within the budget.
+
+    :param modules: Names of the modules to check.
+    :param budget_ms: Max cumulative import time (ms) of each module.
+    :return: List of the violations found.
+    """
+    violations = []
+    for module in modules:
+        import_ms, imported = measureImport(module)
+        heavy = sorted(imported & HEAVY_MODULES)
+        print(f"{module}: {import_ms:.1f} ms")
+        if heavy:
+            violations.append(f"{module} eagerly imports {', '.join(heavy)}")
+        if import_ms > budget_ms:
+            violations.append(f"{module} takes {import_ms:.1f} ms to import (budget {budget_ms} ms)")
+    return violations
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Checks the startup import cost of the SpotIt entry points.")
+    parser.add_argument("modules", nargs="*", default=ENTRY_POINTS, help="Modules to check.")
+    parser.add_argument("--budget-ms", type=float, default=100, help="Max cumulative import time of each module.")
+    args = parser.parse_args()
+
+    violations = checkImports(args.modules, args.budget_ms)
+    for violation in violations:
+        print(f"FAILED: {violation}")
+    sys.exit(1 if violations else 0)
@@ -0,0 +1,32 @@
+from Classes.BaselineArtifacts import BaselineArtifacts
+import argparse
+import sys
+import time
+import main
+
+def compileBaseline(args):
+    # Loads the baseline once and stores its precompiled artifacts
+    started = time.perf_counter()
+    baseline = main.setSource("baseline", args.baseline_png, args.baseline_xml, args.app_package, args.app_rows_only)
+    if baseline['image'] is None:
+        return False
+    print("Analyzing baseline components...")
+    excluded_bounds = baseline['uihierarchy'].get_bounds_excluding_package(args.app_package)
+    BaselineArtifacts.compile(
+        args.baseline_png, args.baseline_xml, args.app_package, args.output,
+        baseline['uihierarchy'], baseline['dimension'], excluded_bounds, baseline['image']
+    )
+    print(f"Compiled baseline saved into {args.output} ({time.perf_counter() - started:.2f}s).")
+    return True
+
+def parseArguments(argv):
+    parser = argparse.ArgumentParser(description="Compiles a golden baseline into artifacts reused by every comparison against it.")
+    parser.add_argument("baseline_png", help="Baseline screenshot (PNG or raw framebuffer dump).")
+    parser.add_argument("baseline_xml", help="Baseline UI hierarchy dump.")
+    parser.add_argument("app_package", help="Package of the app under test.")
+    parser.add_argument("output", help="Directory where the compiled baseline is saved.")
+    parser.add_argument("--app-rows-only", action="store_true", help="Read only the capture rows covered by the app package components.")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    sys.exit(0 if compileBaseline(parseArguments(sys.argv[1:])) else 1)
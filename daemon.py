@@ -0,0 +1,321 @@
+from Classes.ReportWriter import ReportWriter
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing.managers import SyncManager
+import argparse
+import importlib
+import json
+import os
+import queue
+import signal
+import socketserver
+import sys
+import threading
+import time
+import batch
+import main
+
+# Heavy dependencies imported by each worker before its first job
+WARM_MODULES = ["main", "cv2", "PyQt5.QtXml", "pytesseract", "PyShapes"]
+
+# Queue shared by the workers to send the report lines of their jobs back to the daemon
+worker_results = None
+
+class ServiceUnavailable(Exception):
+    # Raised when a job cannot be queued right now, e.g. while the worker pool is restarted
+    pass
+
+class QueueStream:
+    def __init__(self, results, job_id):
+        # File-like object forwarding each written report line of a job to the daemon
+        self.results = results
+        self.job_id = job_id
+
+    def write(self, text):
+        self.results.put((self.job_id, text))
+
+    def flush(self):
+        pass
+
+def ignoreInterruptions():
+    # Leaves the shutdown of the helper processes to the daemon, which receives the interruption or termination too
+    # (e.g. Ctrl-C or a stop sent to the whole process group); the workers also inherit the daemon's SIGTERM handler
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+def initWorker(results):
+    # Imports the heavy dependencies once per worker, and silences the console progress messages
+    global worker_results
+    worker_results = results
+    ignoreInterruptions()
+    sys.stdout = open(os.devnull, "w")
+    for module in WARM_MODULES:
+        importlib.import_module(module)
+
+def runJob(job_id, job, defaults):
+    # Runs a comparison in a worker, streaming its report lines and a final end marker
+    report_writer = ReportWriter(stream=QueueStream(worker_results, job_id))
+    try:
+        job_arguments = batch.jobArguments(job, defaults)
+        os.makedirs(job_arguments.output, exist_ok=True)
+        main.runComparison(job_arguments, report_writer)
+    except Exception as exception:
+        report_writer.writeRecord("error", error=f"{type(exception).__name__}: {exception}")
+    finally:
+        report_writer.close()
+        worker_results.put((job_id, None))
+
+class ComparisonService:
+    def __init__(self, defaults, workers, latency_window=1000, run_job=runJob):
+        """
+        Keeps a warm pool of worker processes running the comparison jobs.
+
+        :param defaults: Arguments with the defaults of each comparison (see batch.jobArguments).
+        :param workers: Number of worker processes.
+        :param latency_window: Number of latest jobs used for the latency percentiles.
+        :param run_job: Function running a job in a worker, sending its report lines and end marker (see runJob).
+        """
+        self.defaults = defaults
+        self.workers = workers
+        self.run_job = run_job
+        self.manager = SyncManager()
+        self.manager.start(ignoreInterruptions)
+        self.results = self.manager.Queue()
+        self.pool = self._newPool()
+        self.lock = threading.Lock()
+        self.job_streams = {}
+        self.next_job_id = 0
+        self.completed = 0
+        self.failed = 0
+        self.pool_restarts = 0
+        self.latencies = deque(maxlen=latency_window)
+        self.started = time.time()
+        self.dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+        self.dispatcher.start()
+
+    def _dispatch(self):
+        # Routes the report lines sent by the workers to the stream of their job
+        while True:
+            item = self.results.get()
+            if item is None:
+                return
+            job_id, text = item
+            with self.lock:
+                job_stream = self.job_streams.get(job_id)
+            if job_stream:
+                job_stream.put(text)
+
+    def _newPool(self):
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=initWorker, initargs=(self.results,))
+
+    def _restartPool(self, broken_pool):
+        # Replaces a pool broken by a dead worker, once even when several requests notice it
+        with self.lock:
+            if self.pool is not broken_pool:
+                return
+            self.pool = self._newPool()
+            self.pool_restarts += 1
+        broken_pool.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, job):
+        """
+        Queues a comparison job.
+
+        :param job: Job dictionary, as in a batch manifest line; a job without 'id' is named after its number in the service.
+        :return: Iterator over the JSON Lines of the job's report, ending when the job is done.
+        """
+        required = ["actual_png", "actual_xml"]
+        if "baseline_artifacts" not in job:
+            required += ["baseline_png", "baseline_xml"]
+        for key in required:
+            if key not in job:
+                raise ValueError(f"Missing job field: {key}")
+        job_stream = queue.Queue()
+        started = time.perf_counter()
+        # The stream is registered under the lock the dispatcher takes, so no line of the job is routed before it exists
+        with self.lock:
+            job_id = self.next_job_id
+            self.next_job_id += 1
+            job = job if 'id' in job else {'id': f"job-{job_id + 1}", **job}
+            pool = self.pool
+            try:
+                future = pool.submit(self.run_job, job_id, job, self.defaults)
+            except BrokenProcessPool:
+                future = None
+            else:
+                self.job_streams[job_id] = job_stream
+        if future is None:
+            self._restartPool(pool)
+            raise ServiceUnavailable("A worker process died, the worker pool was restarted. Please retry.")
+        future.add_done_callback(lambda future: self._endCrashedJob(job_id, future))
+        return self._stream(job_id, job_stream, started)
+
+    def _endCrashedJob(self, job_id, future):
+        # Ends the stream of a job whose worker died, since the worker will never send its end marker
+        if not future.cancelled() and future.exception() is None:
+            return
+        error = "the job was cancelled" if future.cancelled() else f"{type(future.exception()).__name__}: {future.exception()}"
+        with self.lock:
+            job_stream = self.job_streams.get(job_id)
+        if job_stream:
+            job_stream.put(json.dumps({"type": "error", "error": error}, separators=(",", ":")) + "\n")
+            job_stream.put(None)
+
+    def _stream(self, job_id, job_stream, started):
+        failed = False
+        try:
+            while True:
+                text = job_stream.get()
+                if text is None:
+                    break
+                failed = failed or text.startswith('{"type":"error"')
+                yield text
+        finally:
+            with self.lock:
+                self.job_streams.pop(job_id, None)
+                self.latencies.append(time.perf_counter() - started)
+                self.completed += 1
+                self.failed += failed
+
+    def metrics(self):
+        # Gets the queue depth, counters and latency percentiles (seconds) of the service
+        with self.lock:
+            in_flight = len(self.job_streams)
+            latencies = sorted(self.latencies)
+            completed, failed, pool_restarts = self.completed, self.failed, self.pool_restarts
+
+        def percentile(rank):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(rank * len(latencies)))], 4)
+
+        return {
+            "workers": self.workers,
+            "in_flight": in_flight,
+            "queue_depth": max(0, in_flight - self.workers),
+            "completed": completed,
+            "failed": failed,
+            "pool_restarts": pool_restarts,
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "latency_seconds": {"p50": percentile(0.5), "p90": percentile(0.9), "p99": percentile(0.99)}
+        }
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+        self.results.put(None)
+        self.dispatcher.join()
+        self.manager.shutdown()
+
+class ComparisonRequestHandler(BaseHTTPRequestHandler):
+    # GET /health, GET /metrics, and POST /compare with a JSON job streaming back its JSON Lines report
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._sendJson(200, {"status": "ok"})
+        elif self.path == "/metrics":
+            self._sendJson(200, self.server.service.metrics())
+        else:
+            self._sendJson(404, {"error": f"Unknown endpoint: {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/compare":
+            self._sendJson(404, {"error": f"Unknown endpoint: {self.path}"})
+            return
+        try:
+            job = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            lines = self.server.service.submit(job)
+        except ServiceUnavailable as exception:
+            self._sendJson(503, {"error": str(exception)})
+            return
+        except (ValueError, TypeError, AttributeError) as exception:
+            self._sendJson(400, {"error": str(exception)})
+            return
+        except Exception as exception:
+            self._sendJson(500, {"error": f"{type(exception).__name__}: {exception}"})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for line in lines:
+            data = line.encode("utf-8")
+            self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _sendJson(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self):
+        # Unix domain socket clients have no address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        sys.stderr.write(f"[{self.log_date_time_string()}] {format % args}\n")
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ("unix", 0)
+
+def stopServing(signum, frame):
+    # Handles a termination request as an interruption, so the service shuts down cleanly
+    raise KeyboardInterrupt()
+
+def createServer(args, service):
+    """
+    Creates the HTTP server answering the requests of a service, on a unix domain socket or a TCP port.
+
+    :param args: Daemon arguments with the socket, or the host and port (0 picks a free one).
+    :param service: ComparisonService running the jobs.
+    :return: The server, not serving yet.
+    """
+    if args.socket:
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
+        server = UnixHTTPServer(args.socket, ComparisonRequestHandler)
+        print(f"SpotIt daemon listening on unix socket {args.socket}", flush=True)
+    else:
+        server = ThreadingHTTPServer((args.host, args.port), ComparisonRequestHandler)
+        print(f"SpotIt daemon listening on http://{args.host}:{server.server_address[1]}", flush=True)
+    server.service = service
+    return server
+
+def serve(args):
+    # Starts the service and answers the requests until interrupted
+    service = ComparisonService(args, args.workers)
+    server = createServer(args, service)
+    signal.signal(signal.SIGTERM, stopServing)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+def parseArguments(argv):
+    parser = argparse.ArgumentParser(description="Serves SpotIt comparisons from a warm pool of worker processes.", parents=[main.comparisonParser(), main.pairParser()])
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on.")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on (0 picks a free one).")
+    parser.add_argument("--socket", default=None, help="Listen on this unix domain socket instead of TCP.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Number of worker processes.")
+    parser.add_argument("--app-package", default=None, help="Package of the app under test, unless given by the job.")
+    parser.add_argument("--output", default="output", help="Folder where the visual reports of each job are saved in a subfolder, unless given by the job.")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    serve(parseArguments(sys.argv[1:]))
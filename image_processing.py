@@ -1,9 +1,16 @@
-from PIL import Image
 import tempfile
-from PyShapes import *
-import cv2
-import numpy as np
-import pytesseract
+import os
+import utils
+
+# Heavy dependencies only loaded by the analyses needing them
+Image = utils.lazy_import("PIL.Image")
+np = utils.lazy_import("numpy")
+cv2 = utils.lazy_import("cv2")
+pytesseract = utils.lazy_import("pytesseract")
+PyShapes = utils.lazy_import("PyShapes")
+
+RAW_FRAMEBUFFER_EXTENSIONS = {".raw", ".rgba", ".fb"}
+RAW_FORMAT_RGBA_8888 = 1
 
 def getTextFromImage(image):
     """
@@ -57,7 +64,7 @@ def getImageContentShape(image):
         image.save(tmp.name)
         temp_path = tmp.name
 
-        shapes = PyShape(temp_path)
+        shapes = PyShapes.PyShape(temp_path)
         shapes_dictionary = shapes.get_all_shapes()
         shapes.close()
         detected_shapes = [key for key, value in shapes_dictionary.items() if value == 1]
@@ -94,32 +101,143 @@ def getColorsFromImage(image):
 
     return set(color_array)
 
-def is_image_all_black(img):
+def is_image_all_black(img, rows_per_chunk=64):
     """
     Checks whether the given image is entirely black (grayscale value 0 everywhere).
+    Rows are checked in chunks, stopping at the first chunk with a non-black pixel.
 
-    :param img: A PIL Image object.
+    :param img: A PIL Image object, or a NumPy RGB/RGBA array.
+    :param rows_per_chunk: Number of rows reduced at once.
     :return: True if all pixels are black, False otherwise.
     """
-    grayscale_img = img.convert("L")
-    pixels = grayscale_img.getdata()
-    return all(pixel == 0 for pixel in pixels)
+    pixels = img if isinstance(img, np.ndarray) else np.asarray(img.convert("RGB"))
+    for top in range(0, pixels.shape[0], rows_per_chunk):
+        chunk = pixels[top:top + rows_per_chunk, :, :3]
+        if not chunk.any():
+            continue
+        # Same integer luma as PIL's "L" conversion, so dark but non-zero pixels still count as black
+        red, green, blue = (chunk[:, :, channel].astype(np.uint32) for channel in range(3))
+        if ((red * 19595 + green * 38470 + blue * 7471 + 0x8000) >> 16).any():
+            return False
+    return True
+
+def getRectanglesUnion(rectangles, size):
+    """
+    Splits the union of possibly overlapping rectangles into disjoint ones, so every
+    covered pixel is painted once. Rows with the same covered columns are joined.
+
+    :param rectangles: List of rectangles defined as [(x1, y1, x2, y2), ...], with inclusive ends.
+    :param size: Tuple (width, height) of the image the rectangles are clipped to.
+    :return: Tuple (list of disjoint boxes (x1, y1, x2, y2) with exclusive ends, covered pixel count).
+    """
+    width, height = size
+    boxes = [
+        (max(0, x1), max(0, y1), min(width, x2 + 1), min(height, y2 + 1))
+        for (x1, y1, x2, y2) in rectangles
+    ]
+    boxes = [box for box in boxes if box[0] < box[2] and box[1] < box[3]]
+    rows = sorted({y for box in boxes for y in (box[1], box[3])})
+
+    union = []
+    open_boxes = {}
+    for top, bottom in zip(rows, rows[1:]):
+        intervals = []
+        for x1, x2 in sorted((box[0], box[2]) for box in boxes if box[1] <= top and box[3] >= bottom):
+            if intervals and x1 <= intervals[-1][1]:
+                intervals[-1][1] = max(intervals[-1][1], x2)
+            else:
+                intervals.append([x1, x2])
+
+        # Boxes whose columns are still covered grow down, the others are closed
+        continued = {}
+        for x1, x2 in intervals:
+            continued[(x1, x2)] = open_boxes.pop((x1, x2), top)
+        union.extend((x1, box_top, x2, top) for (x1, x2), box_top in open_boxes.items())
+        open_boxes = continued
+        last_bottom = bottom
+    if open_boxes:
+        union.extend((x1, box_top, x2, last_bottom) for (x1, x2), box_top in open_boxes.items())
+
+    covered = sum((x2 - x1) * (y2 - y1) for (x1, y1, x2, y2) in union)
+    return union, covered
+
+def readRawFramebuffer(filepath):
+    """
+    Maps a raw framebuffer dump (as written by Android 'screencap' without -p) into memory.
+    The header holds width, height and pixel format as little-endian uint32, followed by
+    a colorspace uint32 on Android 9 and later. Only RGBA_8888 dumps are supported.
 
-def addMask(image, rectangles):
+    :param filepath: Path of the raw dump.
+    :return: A read-only NumPy memmap of shape (height, width, 4).
+    """
+    header = np.fromfile(filepath, dtype="<u4", count=3)
+    if header.size < 3:
+        raise ValueError(f"Invalid raw framebuffer header: {filepath}")
+    width, height, pixel_format = (int(value) for value in header)
+    if pixel_format != RAW_FORMAT_RGBA_8888:
+        raise ValueError(f"Unsupported raw framebuffer pixel format {pixel_format}: {filepath}")
+
+    header_size = os.path.getsize(filepath) - width * height * 4
+    if header_size not in (12, 16):
+        raise ValueError(f"Raw framebuffer size does not match its {width}x{height} header: {filepath}")
+    return np.memmap(filepath, dtype=np.uint8, mode="r", offset=header_size, shape=(height, width, 4))
+
+def loadImage(filepath, rows=None):
+    """
+    Loads a capture straight into a NumPy array. Raw framebuffer dumps are memory mapped
+    and kept as RGBA, their alpha channel is dropped when the frame is copied by addMask;
+    encoded images are decoded by OpenCV, directly into RGB when supported.
+
+    :param filepath: Path of a PNG/JPEG capture or of a raw framebuffer dump.
+    :param rows: Optional tuple (y1, y2). Only these rows are returned, as a view of the capture,
+        so the other rows of a raw dump are never read.
+    :return: Tuple (NumPy array of shape (rows, width, 3), or (rows, width, 4) for raw dumps,
+        index of its first row in the capture, size (width, height) of the whole capture).
+    """
+    if os.path.splitext(filepath)[1].lower() in RAW_FRAMEBUFFER_EXTENSIONS:
+        frame = readRawFramebuffer(filepath)
+    else:
+        read_flag = getattr(cv2, "IMREAD_COLOR_RGB", None)
+        frame = cv2.imread(filepath, read_flag if read_flag is not None else cv2.IMREAD_COLOR)
+        if frame is None:
+            frame = np.asarray(Image.open(filepath).convert("RGB"))
+        elif read_flag is None:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+    size = (frame.shape[1], frame.shape[0])
+    if rows is None:
+        return frame, 0, size
+    y1 = min(frame.shape[0], max(0, rows[0]))
+    y2 = max(y1, min(frame.shape[0], rows[1]))
+    return frame[y1:y2], y1, size
+
+def addMask(image, rectangles, size=None, top=0):
     """
     Applies a white mask (rectangle) over the specified areas in the image.
 
-    :param image: A PIL Image object.
+    :param image: A PIL Image object, or a NumPy RGB/RGBA array.
     :param rectangles: List of rectangles defined as [(x1, y1, x2, y2), ...].
+    :param size: Optional size (width, height) of the new image when the NumPy array only holds a band of its rows;
+        the rows outside the band are white.
+    :param top: Row of the new image where the band of a NumPy array starts.
     :return: A new masked PIL Image.
     """
-    from PIL import ImageDraw
-    masked_image = Image.new("RGB", image.size)
-    masked_image.paste(image, (0, 0))
-    draw = ImageDraw.Draw(masked_image)
+    if isinstance(image, np.ndarray):
+        # Unpacks RGB or RGBA rows into the new image in a single copy
+        height, width, channels = image.shape
+        masked_image = Image.frombytes("RGB", (width, height), np.ascontiguousarray(image), "raw", "RGBX" if channels == 4 else "RGB")
+        if size and (size != (width, height) or top):
+            band_image = masked_image
+            masked_image = Image.new("RGB", size, (255, 255, 255))
+            masked_image.paste(band_image, (0, top))
+    else:
+        masked_image = Image.new("RGB", image.size)
+        masked_image.paste(image, (0, 0))
 
-    for (x1, y1, x2, y2) in rectangles:
-        draw.rectangle([x1, y1, x2, y2], outline=None, fill="white")
+    # Overlapping rectangles are painted once, through their disjoint union
+    union, _ = getRectanglesUnion(rectangles, masked_image.size)
+    for box in union:
+        masked_image.paste((255, 255, 255), box)
 
     return masked_image
 
@@ -134,7 +252,7 @@ def addHighlight(image, rectangles):
     new_image = Image.new("RGB", image.size, (255, 255, 255))
 
     for (x1, y1, x2, y2) in rectangles:
-        region = image.convert("RGB").crop((x1, y1, x2, y2))
+        region = image.crop((x1, y1, x2, y2)).convert("RGB")
         new_image.paste(region, (x1, y1))
 
     return new_image
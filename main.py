@@ -1,32 +1,73 @@
 from Classes.UIHierarchy import UIHierarchy
-from Classes.Screenshot import Screenshot
 from Classes.Oracle import Oracle
 from Classes.Comparators.ImageComparison import ImageComparison
 from Classes.Comparators.UIComponentsComparison import UIComponentsComparison
-from PIL import Image
-import cv2
+from Classes.Comparators.ChangeIndex import BandedChangeIndex, ChangeIndex
+from Classes.Fingerprint import Fingerprint
+from Classes.ResultCache import ResultCache
+from Classes.ReportWriter import ReportWriter
+from Classes.DensityNormalizer import DensityNormalizer
+from Classes.BaselineArtifacts import BaselineArtifacts
+from Classes.MemoryMonitor import MemoryMonitor, MemoryBudgetExceeded
+import argparse
 import image_processing
+import os
+import shutil
 import sys
+import utils
+
+cv2 = utils.lazy_import("cv2")
+
+# Annotated images saved in the output folder of a comparison finding differences
+ANNOTATED_IMAGES = ("diff_output.png", "baseline_with_boxes.png", "actual_with_boxes.png")
 
 def setUIHierarchy(filepath, package):
+    # Parses the UI hierarchy, its screen dimension and the bounds not belonging to the app package
     dom = UIHierarchy(filepath)
     return dom, dom.get_document_dimensions(), dom.get_bounds_excluding_package(package)
 
-def setScreenshot(filepath, dimension, excluded_bounds):
-    image = Image.open(filepath)
-    width, height = dimension
+def setScreenshot(filepath, excluded_bounds, rows=None):
+    # Loads the capture (PNG or raw framebuffer) and masks every area not belonging to the app package
+    image, top, size = image_processing.loadImage(filepath, rows)
     bounds_array = [(bounds[0], bounds[1], bounds[2], bounds[3]) for _, bounds in excluded_bounds]
-    app_screen = image_processing.addMask(image, bounds_array)
-    if image_processing.is_image_all_black(app_screen):
+    _, covered = image_processing.getRectanglesUnion(bounds_array, size)
+    print(f"\tMasked coverage: {covered * 100 / (size[0] * size[1]):.1f}%")
+
+    # Masked areas and the rows not read are painted white, so only a whole unmasked capture can be all black
+    if not covered and image.shape[0] == size[1] and image_processing.is_image_all_black(image):
         print('No package components detected.')
         return None
-    else:
-        scr = Screenshot(app_screen, (0,0, width, height))
-    return scr
+    return image_processing.addMask(image, bounds_array, size, top)
+
+def setSource(name, png, xml, package, app_rows_only=False):
+    # Loads the UIHierarchy and the masked capture of one side of the comparison
+    print(f"Getting {name} data...")
+    uihierarchy, dimension, excluded_bounds = setUIHierarchy(xml, package)
+    if uihierarchy:
+        print("\tUIHierarchy: ok")
+        print(f"\tScreen dimension: {dimension}")
+        print(f"\tNo package matching bounds: {excluded_bounds}")
+    rows = uihierarchy.get_package_rows(package) if app_rows_only else None
+    app_screen = setScreenshot(png, excluded_bounds, rows)
+    if app_screen is not None:
+        print(f"{name.capitalize()} Screenshot: OK")
+    return {"uihierarchy": uihierarchy, "dimension": dimension, "image": app_screen}
 
-def getUIComponentsInDifferenceZones(baseline, actual, boundboxes):
+def getDocumentImage(image, dimension):
+    """
+    Gets the capture where only the document area, from the top left corner, is visible.
+
+    :param image: PIL Image of the capture.
+    :param dimension: (width, height) of the document.
+    :return: The capture itself when the document covers it, otherwise a copy painted white outside the document.
+    """
+    if dimension[0] >= image.size[0] and dimension[1] >= image.size[1]:
+        return image
+    return image_processing.addHighlight(image, [(0, 0, *dimension)])
+
+def getUIComponentsInDifferenceZones(baseline, actual, boundboxes, change_index):
     # Verify the visual change is really contained in this component rendering
-    def verifyByImage(uicomponent):
+    def verifyByImage(uicomponent, source):
         change_found = []
         children_bounds = []
         if uicomponent.correlation:
@@ -34,16 +75,16 @@ def getUIComponentsInDifferenceZones(baseline, actual, boundboxes):
                 children_bounds.extend([child.bounds for child in uicomponent.children])
             if uicomponent.correlation['UIComponent'].children:
                 children_bounds.extend([child.bounds for child in uicomponent.correlation['UIComponent'].children])
-            uicomponent_without_children = image_processing.addMask(uicomponent.screenshot.image, children_bounds)
-            related_uicomponent_without_children = image_processing.addMask(uicomponent.correlation['UIComponent'].screenshot.image, children_bounds)
-            comparison_uicomponents_visual = ImageComparison(uicomponent_without_children, related_uicomponent_without_children)
+            # Counts the changed pixels of the component without its children through the change index
+            bounds = {source: uicomponent.bounds, "actual" if source == "baseline" else "baseline": uicomponent.correlation['UIComponent'].bounds}
+            are_same = not change_index.countChanges(bounds["baseline"], bounds["actual"], children_bounds)
 
-            if comparison_uicomponents_visual.areSame():
+            if are_same:
                 if not uicomponent.children:
                     return []
                 else:
                     for child in uicomponent.children:
-                        result = verifyByImage(child)
+                        result = verifyByImage(child, source)
                         if result:
                             if isinstance(result, list):
                                 change_found.extend(result)
@@ -66,10 +107,10 @@ def getUIComponentsInDifferenceZones(baseline, actual, boundboxes):
             to_extend=[]
             to_remove=[]
             for uicomponent in new_area[str(bound_box)][source]:
-                verified_uicomponent = verifyByImage(uicomponent)
-            if [uicomponent]!=verified_uicomponent:
-                to_extend.extend(verified_uicomponent)
-                to_remove.append(uicomponent)
+                verified_uicomponent = verifyByImage(uicomponent, source)
+                if [uicomponent]!=verified_uicomponent:
+                    to_extend.extend(verified_uicomponent)
+                    to_remove.append(uicomponent)
             new_area[str(bound_box)][source].extend(to_extend)
             new_area[str(bound_box)][source] = [item for item in new_area[str(bound_box)][source] if item not in to_remove]
 
@@ -85,67 +126,329 @@ def getUIComponentsInDifferenceZones(baseline, actual, boundboxes):
             
     return uicomponents_in_difference_zone
 
-baseline_png = sys.argv[1]
-baseline_xml = sys.argv[2]
-actual_png = sys.argv[3]
-actual_xml = sys.argv[4]
-app_package = sys.argv[5]
-output = sys.argv[6]
-
-#Defining Baseline
-print("Getting baseline data...")
-baseline_uihierarchy, baseline_dimension, baseline_excluded_bounds = setUIHierarchy(baseline_xml, app_package)
-if baseline_uihierarchy:
-    print("\tUIHierarchy: ok")
-    print(f"\tScreen dimension: {baseline_dimension}")
-    print(f"\tNo package matching bounds: {baseline_excluded_bounds}")
-baseline_screenshot = setScreenshot(baseline_png, baseline_dimension, baseline_excluded_bounds)
-if baseline_screenshot:
-    print("Baseline Screenshot: OK")
-
-#Defining Actual
-print("Getting actual data...")
-actual_uihierarchy, actual_dimension, actual_excluded_bounds = setUIHierarchy(actual_xml, app_package)
-if actual_uihierarchy:
-    print("\tUIHierarchy: ok")
-    print(f"\tScreen dimension: {actual_dimension}")
-    print(f"\tNo package matching bounds: {actual_excluded_bounds}")
-actual_screenshot = setScreenshot(actual_png, actual_dimension, actual_excluded_bounds)
-if actual_screenshot:
-    print("Actual Screenshot: OK")
-
-#Compare screenshots
-print("\nComparing screenshots...")
-comparison_scr = ImageComparison(baseline_screenshot.image, actual_screenshot.image)
-
-# If differences are detected
-if not comparison_scr.areSame():
+def tipAsReport(tip):
+    # Converts a tip into a JSON serializable dictionary, with compact references to its components
+    return {
+        "Resource-id": tip['Resource-id'],
+        "UI Component on Baseline": ReportWriter.componentReference(tip['UI Component on Baseline']),
+        "UI Component on Actual": ReportWriter.componentReference(tip['UI Component on Actual']),
+        "Difference bounds": str(tip['Difference bounds']),
+        "Differences": tip['Differences']
+    }
+
+def differenceAsReport(difference):
+    # Converts a difference found by the Oracle into the fields of its report record
+    zone, resource_id, baseline_component, actual_component, label, description = difference
+    return {
+        "zone": zone,
+        "resource_id": resource_id,
+        "baseline": ReportWriter.componentReference(baseline_component),
+        "actual": ReportWriter.componentReference(actual_component),
+        "label": label,
+        "description": description
+    }
+
+def compare(baseline, actual, output, cluster_distance=None, report_writer=None, annotations=True, cross_density=False, min_feature=24, tile_memory_mb=None, frame_sequence=None, memory_monitor=None):
+    """
+    Compares the baseline and actual sources and classifies their differences.
+
+    :param baseline: Dictionary with the baseline 'uihierarchy', 'dimension' and masked 'image'.
+    :param actual: Dictionary with the actual 'uihierarchy', 'dimension' and masked 'image'.
+    :param output: Folder where the visual reports are saved.
+    :param cluster_distance: Max gap (px) for merging nearby difference boxes, None disables it.
+    :param report_writer: Optional ReportWriter streaming the findings; it also defers the annotated images.
+    :param annotations: Whether the annotated images are saved.
+    :param cross_density: Whether both sides are first scaled into a common working resolution.
+    :param min_feature: Smallest component side (px) preserved when finding the difference contours at a lower pyramid level.
+    :param tile_memory_mb: Memory budget (MB) of the comparison buffers; when given, the images are processed
+        in horizontal bands and the components keep no image copies.
+    :param frame_sequence: Optional FrameSequence of the frame pair; only the regions and components that changed
+        since the previous frame pair are analyzed again.
+    :param memory_monitor: Optional MemoryMonitor accounting each stage; with a budget, the intermediate images
+        are released as soon as their stage ends, and the first stage ending over the budget raises MemoryBudgetExceeded.
+    :return: Report dictionary with the 'status', the list of 'tips' and, when differences are found, the compact
+        'diff_boxes', 'zones' and 'differences' written by the report writer, so a stored report can write them again.
+    """
+    baseline_uihierarchy = baseline['uihierarchy']
+    actual_uihierarchy = actual['uihierarchy']
+    baseline_image, baseline_dimension = baseline['image'], baseline['dimension']
+    actual_image, actual_dimension = actual['image'], actual['dimension']
+    pyramid_level = 0
+    memory_monitor = memory_monitor or MemoryMonitor(enabled=False)
+    release_images = memory_monitor.budget is not None
+
+    # Scale captures from different densities once into a common working resolution
+    if cross_density:
+        normalizer = DensityNormalizer(baseline_dimension, actual_dimension, min_feature)
+        baseline_image = normalizer.normalize(baseline_image, baseline_uihierarchy, normalizer.baseline_scale)
+        actual_image = normalizer.normalize(actual_image, actual_uihierarchy, normalizer.actual_scale)
+        baseline_dimension = actual_dimension = normalizer.getDimension()
+        pyramid_level = normalizer.getPyramidLevel([baseline_uihierarchy, actual_uihierarchy])
+        print(f"Working resolution: {baseline_dimension}, pyramid level: {pyramid_level}")
+        memory_monitor.endStage("normalize")
+
+    # Only the document area of the captures is compared, without analyzing the whole screens as components
+    baseline_image = getDocumentImage(baseline_image, baseline_dimension)
+    actual_image = getDocumentImage(actual_image, actual_dimension)
+
+    #Compare screenshots
+    print("\nComparing screenshots...")
+    uihierarchies = [baseline_uihierarchy, actual_uihierarchy] if cluster_distance is not None else None
+    band_height = ImageComparison.getBandHeight(baseline_dimension[0], tile_memory_mb * 1024 * 1024) if tile_memory_mb else None
+    previous_boxes, dirty_regions = (frame_sequence.previous_boxes, frame_sequence.dirty_regions) if frame_sequence else (None, None)
+    comparison_scr = ImageComparison(baseline_image, actual_image, cluster_distance, uihierarchies, pyramid_level, band_height, previous_boxes, dirty_regions)
+
+    # If no differences are detected
+    are_same = comparison_scr.areSame()
+    if frame_sequence:
+        frame_sequence.setDifferenceBoxes(comparison_scr.raw_boxes)
+    memory_monitor.endStage("compare_screens")
+    if are_same:
+        return {"status": "PASSED", "tips": []}
+
     # Save the visual reports of the differences
-    cv2.imwrite(f'{output}/diff_output.png', comparison_scr.diff)
-    cv2.imwrite(f'{output}/baseline_with_boxes.png', comparison_scr.spoted_on_baseline)
-    cv2.imwrite(f'{output}/actual_with_boxes.png', comparison_scr.spoted_on_actual)
-    print(f"Differences have been saved into output folder.")
+    if report_writer:
+        report_writer.writeDiffBoxes(comparison_scr.boundboxes)
+        if annotations:
+            report_writer.deferImage(f'{output}/diff_output.png', lambda: comparison_scr.diff)
+            report_writer.deferImage(f'{output}/baseline_with_boxes.png', lambda: comparison_scr.spoted_on_baseline)
+            report_writer.deferImage(f'{output}/actual_with_boxes.png', lambda: comparison_scr.spoted_on_actual)
+    elif annotations:
+        cv2.imwrite(f'{output}/diff_output.png', comparison_scr.diff)
+        cv2.imwrite(f'{output}/baseline_with_boxes.png', comparison_scr.spoted_on_baseline)
+        cv2.imwrite(f'{output}/actual_with_boxes.png', comparison_scr.spoted_on_actual)
+        print(f"Differences have been saved into output folder.")
 
     # Identify the related components
-    comparison_uicomponents = UIComponentsComparison(baseline_uihierarchy, actual_uihierarchy)
+    comparison_uicomponents = UIComponentsComparison(baseline_uihierarchy, actual_uihierarchy, frame_sequence.score_cache if frame_sequence else None)
+    memory_monitor.endStage("correlate")
 
-    # Get isoleted images for each UI component
+    # Get isoleted images for each UI component, built and analyzed on their first use
     baseline_uicomponents = baseline_uihierarchy.list_all_components()
     actual_uicomponents = actual_uihierarchy.list_all_components()
+    keep_images = not tile_memory_mb and not release_images
+    # Components unchanged since the previous frame reuse their analysis, and only rebuild their images if needed
+    reused = frame_sequence.carryAnalysis() if frame_sequence else set()
     for uicomponent in baseline_uicomponents:
-        uicomponent.addScreenshot(baseline_screenshot.image)
+        uicomponent.addScreenshot(baseline_image, keep_images and id(uicomponent) not in reused)
     for uicomponent in actual_uicomponents:
-        uicomponent.addScreenshot(actual_screenshot.image)
+        uicomponent.addScreenshot(actual_image, keep_images and id(uicomponent) not in reused)
+    memory_monitor.endStage("component_screenshots")
 
-    # Identify the affected components
-    uicomponents_in_difference_zones = getUIComponentsInDifferenceZones({'uihierarchy': baseline_uihierarchy, 'screenshot': baseline_screenshot}, {'uihierarchy': actual_uihierarchy, 'screenshot': actual_screenshot}, comparison_scr.boundboxes)
+    # Identify the affected components; the changes of each component are counted on summed-area tables of the
+    # full-screen difference, or band by band in tiled mode, instead of comparing full-size images per component
+    change_index = BandedChangeIndex(baseline_image, actual_image, band_height) if band_height else ChangeIndex(baseline_image, actual_image, comparison_scr.diff)
+    if release_images:
+        comparison_scr.releaseImages()
+    uicomponents_in_difference_zones = getUIComponentsInDifferenceZones({'uihierarchy': baseline_uihierarchy, 'image': baseline_image}, {'uihierarchy': actual_uihierarchy, 'image': actual_image}, comparison_scr.boundboxes, change_index)
+    del change_index
+    memory_monitor.endStage("difference_zones")
+    if report_writer:
+        report_writer.writeZones(uicomponents_in_difference_zones)
 
-    # Write the textual reports with changes classifications
-    oracle = Oracle({"screenshot": baseline_screenshot, "uihierarchy": baseline_uihierarchy}, {"screenshot": actual_screenshot, "uihierarchy": actual_uihierarchy}, uicomponents_in_difference_zones)
-    tips=oracle.getTips()
-    for tip in tips:
+    # Classify the changes
+    oracle = Oracle({"image": baseline_image, "uihierarchy": baseline_uihierarchy}, {"image": actual_image, "uihierarchy": actual_uihierarchy}, uicomponents_in_difference_zones, report_writer)
+    tips = oracle.getTips()
+    memory_monitor.endStage("classify")
+    return {
+        "status": "FAILED",
+        "tips": [tipAsReport(tip) for tip in tips],
+        "diff_boxes": [[int(value) for value in box] for box in comparison_scr.boundboxes],
+        "zones": {
+            zone: {side: [ReportWriter.componentReference(component) for component in sources[side]] for side in ("baseline", "actual")}
+            for zone, sources in uicomponents_in_difference_zones.items()
+        },
+        "differences": [differenceAsReport(difference) for difference in oracle.differences]
+    }
+
+def printMemoryReport(memory_report):
+    # Writes the memory accounted in each stage of the comparison
+    print("\nMemory usage by stage:")
+    for stage in memory_report['stages']:
+        traced = f", {stage['traced_peak_mb']} MB traced peak, {stage['live_images']} live images with {stage['image_mb']} MB" if 'traced_peak_mb' in stage else ""
+        print(f"\t{stage['stage']}: {stage['peak_rss_mb']} MB peak RSS, {stage['used_rss_mb']} MB over the start{traced}")
+
+def printReport(report):
+    # Writes the textual reports with changes classifications
+    if report['status'] == "PASSED":
+        print("PASSED. No differences found.")
+        return
+    if report['status'] == "OVER_MEMORY_BUDGET":
+        print(f"OVER_MEMORY_BUDGET. {report['error']}")
+        return
+    for tip in report['tips']:
         print(f"\nResource-id: {tip['Resource-id']}\nUI Component on Baseline: {tip['UI Component on Baseline']}\nUI Component on Actual: {tip['UI Component on Actual']}\nDifference bounds: {tip['Difference bounds']}\nDifferences: {tip['Differences']}")
 
-# If no differences are detected
-else:
-  print("PASSED. No differences found.")
\ No newline at end of file
+def run(args):
+    # Runs a full comparison for the command line arguments
+    report_writer = ReportWriter(args.report) if args.report else None
+    try:
+        return runComparison(args, report_writer)
+    finally:
+        if report_writer:
+            report_writer.close()
+
+def runComparison(args, report_writer=None):
+    # Loads both sources and gets the report of their comparison
+    baseline, actual = loadSources(args)
+    return comparePair(args, baseline, actual, report_writer)
+
+def loadSources(args):
+    # Loads the baseline and actual sources of the comparison
+    if args.baseline_artifacts:
+        print("Loading compiled baseline...")
+        baseline = BaselineArtifacts.load(args.baseline_artifacts, args.app_package)
+        print(f"\tScreen dimension: {baseline['dimension']}")
+    else:
+        baseline = setSource("baseline", args.baseline_png, args.baseline_xml, args.app_package, args.app_rows_only)
+    actual = setSource("actual", args.actual_png, args.actual_xml, args.app_package, args.app_rows_only)
+    return baseline, actual
+
+def getCacheOptions(args):
+    # Gets the options that change the report of a comparison, so a cached report is only reused with the same ones
+    return {
+        "app_package": args.app_package,
+        "cluster_distance": args.cluster_distance,
+        "cross_density": args.cross_density,
+        "min_feature": args.min_feature,
+        "tile_memory_mb": args.tile_memory_mb
+    }
+
+def copyAnnotatedImages(source, output):
+    """
+    Copies the annotated images of a previous comparison into the output folder.
+
+    :param source: Folder where the previous comparison saved its annotated images.
+    :param output: Output folder of the current comparison.
+    :return: True if all the images are in the output folder, False otherwise (nothing is copied).
+    """
+    if source is None or not all(os.path.isfile(os.path.join(source, name)) for name in ANNOTATED_IMAGES):
+        return False
+    if os.path.abspath(source) != os.path.abspath(output):
+        for name in ANNOTATED_IMAGES:
+            shutil.copyfile(os.path.join(source, name), os.path.join(output, name))
+    return True
+
+def comparePair(args, baseline, actual, report_writer=None, frame_sequence=None):
+    # Gets the report of the comparison of two loaded sources, reusing the previous frame pair of a FrameSequence if given
+    if report_writer:
+        report_writer.writePair(
+            {"png": args.baseline_png, "xml": args.baseline_xml},
+            {"png": args.actual_png, "xml": args.actual_xml}
+        )
+    if baseline['image'] is None or actual['image'] is None:
+        if frame_sequence:
+            frame_sequence.reset()
+        if report_writer:
+            report_writer.writeSummary("NO_PACKAGE")
+        return None
+
+    # Identical app pixels need no further analysis
+    baseline_fingerprint = baseline.get('fingerprint') or Fingerprint(baseline['image'], baseline['uihierarchy'])
+    actual_fingerprint = actual.get('fingerprint') or Fingerprint(actual['image'], actual['uihierarchy'])
+    if frame_sequence:
+        frame_sequence.startFrame(baseline, actual)
+    if baseline_fingerprint.pixels == actual_fingerprint.pixels:
+        report = {"status": "PASSED", "tips": []}
+        if frame_sequence:
+            frame_sequence.setDifferenceBoxes([])
+            frame_sequence.endFrame(report, args.output)
+        printReport(report)
+        if report_writer:
+            report_writer.writeSummary(report['status'], tips=0, identical=True)
+        return report
+
+    # Pairs analyzed before reuse their stored report; a failed report is only reused along with its
+    # annotated images, so the output folder holds the same files as after a fresh comparison
+    cache = ResultCache(args.cache_dir, getCacheOptions(args)) if args.cache_dir else None
+    annotated = not args.no_annotations
+    if frame_sequence and frame_sequence.unchanged and (frame_sequence.previous_report['status'] != "FAILED" or not annotated or copyAnnotatedImages(frame_sequence.previous_output, args.output)):
+        print("\nReusing the report of the previous frame, which did not change.")
+        report, reused = frame_sequence.previous_report, {"unchanged_frame": True}
+    else:
+        report, reused = cache.get(baseline_fingerprint, actual_fingerprint) if cache else None, {"cached": True}
+        if report is not None and report['status'] == "FAILED" and annotated and not cache.getImages(baseline_fingerprint, actual_fingerprint, args.output, ANNOTATED_IMAGES):
+            report = None
+        if report is not None:
+            print("\nReusing the report of a previous comparison of this pair.")
+    if report is not None:
+        if report_writer:
+            report_writer.writeFindings(report)
+            report_writer.writeSummary(report['status'], tips=len(report['tips']), **reused)
+    else:
+        memory_monitor = MemoryMonitor(args.memory_budget_mb, args.memory_report) if args.memory_budget_mb or args.memory_report else None
+        try:
+            report = compare(baseline, actual, args.output, args.cluster_distance, report_writer, not args.no_annotations, args.cross_density, args.min_feature, args.tile_memory_mb, frame_sequence, memory_monitor)
+        except MemoryBudgetExceeded as exception:
+            # Fails fast; what the comparison built so far is released with its frames, and its annotated images are never built
+            report = {"status": "OVER_MEMORY_BUDGET", "tips": [], "error": str(exception)}
+            if report_writer:
+                report_writer.dropDeferredImages()
+        finally:
+            if memory_monitor:
+                memory_monitor.close()
+        if memory_monitor:
+            printMemoryReport(memory_monitor.getReport())
+        if report_writer:
+            if memory_monitor:
+                report_writer.writeRecord("memory", **memory_monitor.getReport())
+            report_writer.writeSummary(report['status'], tips=len(report['tips']), **({"error": report['error']} if 'error' in report else {}))
+            # The annotated images are saved once the pair is reported, instead of keeping its comparison alive until the report closes
+            report_writer.saveDeferredImages()
+        if cache and report['status'] != "OVER_MEMORY_BUDGET":
+            # The images are stored first, so a stored report always finds them
+            if report['status'] == "FAILED" and annotated:
+                cache.putImages(baseline_fingerprint, actual_fingerprint, args.output, ANNOTATED_IMAGES)
+            cache.put(baseline_fingerprint, actual_fingerprint, report)
+    if frame_sequence:
+        if report['status'] == "OVER_MEMORY_BUDGET":
+            frame_sequence.reset()
+        else:
+            frame_sequence.endFrame(report, args.output)
+
+    printReport(report)
+    return report
+
+def comparisonParser():
+    """
+    Builds the parser of the options shared by every comparison entry point (main, batch, daemon and sequence),
+    given to their own parsers through parents=[...].
+
+    :return: ArgumentParser without help.
+    """
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--cluster-distance", type=int, default=None, help="Merge difference boxes closer than this many pixels.")
+    parser.add_argument("--app-rows-only", action="store_true", help="Read only the capture rows covered by the app package components.")
+    parser.add_argument("--tile-memory-mb", type=float, default=None, help="Process tall captures in bands whose buffers fit in this many MB.")
+    parser.add_argument("--memory-report", action="store_true", help="Trace the allocations and live images of each stage of the comparisons (slower).")
+    parser.add_argument("--memory-budget-mb", type=float, default=None, help="Release intermediate images early, and stop a comparison after the first stage whose peak RSS grew more than this many MB since the comparison started (checked after each stage, not a hard limit).")
+    parser.add_argument("--no-annotations", action="store_true", help="Do not save the annotated images.")
+    return parser
+
+def pairParser():
+    """
+    Builds the parser of the options of comparisons between independent pairs (main, batch and daemon),
+    which a frame sequence does not take, given to their own parsers through parents=[...].
+
+    :return: ArgumentParser without help.
+    """
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--cache-dir", default=None, help="Folder storing the reports of previously compared pairs, shared by concurrent runs.")
+    parser.add_argument("--cross-density", action="store_true", help="Compare captures from devices with different screen densities.")
+    parser.add_argument("--min-feature", type=int, default=24, help="Smallest component side (px) preserved by the cross-density pyramid.")
+    return parser
+
+def parseArguments(argv):
+    parser = argparse.ArgumentParser(description="Spots and classifies the visual differences between two app screens.", parents=[comparisonParser(), pairParser()])
+    parser.add_argument("baseline_png", help="Baseline screenshot (PNG or raw framebuffer dump).")
+    parser.add_argument("baseline_xml", help="Baseline UI hierarchy dump.")
+    parser.add_argument("actual_png", help="Actual screenshot (PNG or raw framebuffer dump).")
+    parser.add_argument("actual_xml", help="Actual UI hierarchy dump.")
+    parser.add_argument("app_package", help="Package of the app under test.")
+    parser.add_argument("output", help="Folder where the visual reports are saved.")
+    parser.add_argument("--baseline-artifacts", default=None, help="Compiled baseline (see compile_baseline.py) used instead of baseline_png and baseline_xml, which can then be '-'.")
+    parser.add_argument("--report", default=None, help="JSON Lines file where the findings are streamed.")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    run(parseArguments(sys.argv[1:]))
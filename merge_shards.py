@@ -0,0 +1,113 @@
+import argparse
+import json
+import sys
+
+def readShard(filepath):
+    """
+    Reads the records of a shard result file written by 'batch.py --shard'.
+
+    :param filepath: Path of the shard JSON Lines file.
+    :return: List of record dictionaries.
+    """
+    records = []
+    with open(filepath, "r", encoding="utf-8") as file:
+        for line in file:
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                # Only the last line can be cut, by a run that was interrupted while writing it
+                if line.endswith("\n"):
+                    raise
+    return records
+
+def isShardComplete(records, header):
+    """
+    Checks that a shard run went through all its jobs: it ends with its summary
+    and holds one result per job announced in its header.
+
+    :param records: Records of the shard result file.
+    :param header: The 'shard' record of the file.
+    :return: True if the shard is complete, False otherwise.
+    """
+    results = sum(record["type"] == "result" for record in records)
+    return records[-1]["type"] == "shard_summary" and results == header["jobs"]
+
+def mergeShards(filepaths, output):
+    """
+    Combines the shard result files into one JSON Lines report, ending with a summary
+    of the statuses and aggregate timings. Missing, incomplete or repeated shards and jobs are reported.
+
+    :param filepaths: Paths of the shard result files.
+    :param output: Path of the merged report.
+    :return: The summary dictionary.
+    """
+    shards = {}
+    incomplete = []
+    for filepath in filepaths:
+        records = readShard(filepath)
+        header = next((record for record in records if record["type"] == "shard"), None)
+        if header is None:
+            raise ValueError(f"{filepath} is not a shard result file.")
+        key = (header["shard"], header["shards"])
+        if key in shards:
+            raise ValueError(f"Shard {key[0]}/{key[1]} is given twice.")
+        shards[key] = records
+        if not isShardComplete(records, header):
+            incomplete.append(key[0])
+
+    counts = {count for _, count in shards}
+    if len(counts) > 1:
+        raise ValueError(f"Shard files come from different partitions: {sorted(counts)} shards.")
+    count = counts.pop() if counts else 0
+    missing = [index for index in range(1, count + 1) if (index, count) not in shards]
+
+    statuses = {}
+    seen_ids = set()
+    duplicated_ids = []
+    timings = {"load_seconds": 0.0, "compare_seconds": 0.0, "wall_seconds_sum": 0.0, "wall_seconds_max": 0.0}
+    with open(output, "w", encoding="utf-8") as file:
+        for key in sorted(shards):
+            for record in shards[key]:
+                if record["type"] == "result":
+                    if record["id"] in seen_ids:
+                        duplicated_ids.append(record["id"])
+                    seen_ids.add(record["id"])
+                    statuses[record["status"]] = statuses.get(record["status"], 0) + 1
+                    timings["load_seconds"] += record["load_seconds"]
+                    timings["compare_seconds"] += record["compare_seconds"]
+                elif record["type"] == "shard_summary":
+                    timings["wall_seconds_sum"] += record["wall_seconds"]
+                    timings["wall_seconds_max"] = max(timings["wall_seconds_max"], record["wall_seconds"])
+                file.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+        summary = {
+            "type": "merged_summary",
+            "shards": count,
+            "missing_shards": missing,
+            "incomplete_shards": sorted(incomplete),
+            "jobs": len(seen_ids),
+            "duplicated_jobs": duplicated_ids,
+            "statuses": statuses,
+            "timings": {key: round(value, 4) for key, value in timings.items()}
+        }
+        file.write(json.dumps(summary, separators=(",", ":")) + "\n")
+    return summary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merges the result files of a sharded batch run into one report.")
+    parser.add_argument("output", help="Path of the merged JSON Lines report.")
+    parser.add_argument("shards", nargs="+", help="Shard result files written by 'batch.py --shard'.")
+    args = parser.parse_args()
+
+    summary = mergeShards(args.shards, args.output)
+    print(f"Merged {len(args.shards)}/{summary['shards']} shards, {summary['jobs']} pairs: {summary['statuses']}")
+    print(f"Timings: {summary['timings']}")
+    if summary["missing_shards"]:
+        print(f"Missing shards: {summary['missing_shards']}")
+    if summary["incomplete_shards"]:
+        print(f"Incomplete shards (interrupted runs): {summary['incomplete_shards']}")
+    if summary["duplicated_jobs"]:
+        print(f"Jobs present in several shards: {summary['duplicated_jobs']}")
+    sys.exit(1 if summary["missing_shards"] or summary["incomplete_shards"] or summary["duplicated_jobs"] else 0)
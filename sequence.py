@@ -0,0 +1,81 @@
+from Classes.FrameSequence import FrameSequence
+from Classes.ReportWriter import ReportWriter
+import argparse
+import os
+import sys
+import time
+import batch
+import main
+
+def frameArguments(index, frame, args):
+    # Builds the arguments of a frame pair, saving its visual reports in a folder of its own
+    frame_id = batch.jobKey(frame) if 'id' in frame else f"frame-{index + 1}"
+    frame_arguments = batch.jobArguments({'output': os.path.join(args.output, frame_id), **frame}, args)
+    return frame_id, frame_arguments
+
+def runSequence(frames, args, report_writer=None):
+    """
+    Compares each frame of an actual sequence (e.g. a screen transition) with the same frame of the baseline sequence.
+    Each frame pair reuses the analysis of the previous one, so its cost follows the size of the change between frames.
+
+    :param frames: List of frame dictionaries, in sequence order.
+    :param args: Sequence arguments with the defaults of each comparison.
+    :param report_writer: Optional ReportWriter streaming the findings of all frames.
+    :return: List of result dictionaries, one per frame, with its status, reuse counters and timings.
+    """
+    results = []
+    frame_sequence = FrameSequence(args.max_dirty_ratio)
+    frames_arguments = [frameArguments(index, frame, args) for index, frame in enumerate(frames)]
+    loader = batch.PrefetchLoader([frame_arguments for _, frame_arguments in frames_arguments], args.prefetch)
+    for (frame_id, _), (frame_arguments, sources, error, load_seconds) in zip(frames_arguments, loader):
+        print(f"\n=== {frame_id} ===")
+        started = time.perf_counter()
+        frame_sequence.stats = {}
+        if error:
+            status = "ERROR"
+            frame_sequence.reset()
+            print(f"\n{frame_id}: failed to load the frame: {error}")
+        else:
+            try:
+                os.makedirs(frame_arguments.output, exist_ok=True)
+                report = main.comparePair(frame_arguments, *sources, report_writer, frame_sequence)
+                status = report['status'] if report else "NO_PACKAGE"
+            except Exception as exception:
+                status, error = "ERROR", exception
+                frame_sequence.reset()
+                print(f"\n{frame_id}: failed to compare the frame: {error}")
+        result = {
+            "id": frame_id,
+            "status": status,
+            "error": str(error) if error else None,
+            **frame_sequence.stats,
+            "load_seconds": round(load_seconds, 4),
+            "compare_seconds": round(time.perf_counter() - started, 4)
+        }
+        if report_writer:
+            report_writer.writeRecord("frame", **result)
+        results.append(result)
+    return results
+
+def parseArguments(argv):
+    parser = argparse.ArgumentParser(description="Compares a sequence of captures (e.g. a screen transition) with a baseline sequence, frame by frame.", parents=[main.comparisonParser()])
+    parser.add_argument("manifest", help="JSON Lines file listing the frame pairs in sequence order, with the same fields as a batch manifest.")
+    parser.add_argument("--app-package", default=None, help="Package of the app under test, unless given by the frame.")
+    parser.add_argument("--output", default="output", help="Folder where the visual reports of each frame are saved.")
+    parser.add_argument("--prefetch", type=int, default=2, help="Max number of loaded frames waiting to be compared.")
+    parser.add_argument("--max-dirty-ratio", type=float, default=0.5, help="Share of a frame that may change before it is analyzed from scratch.")
+    parser.add_argument("--report", default=None, help="JSON Lines file where the findings are streamed.")
+    # Consecutive frames are compared at their own density, and reuse the previous frame instead of a result cache
+    parser.set_defaults(cache_dir=None, cross_density=False, min_feature=24)
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parseArguments(sys.argv[1:])
+    frames = batch.readManifest(args.manifest)
+    report_writer = ReportWriter(args.report) if args.report else None
+    try:
+        results = runSequence(frames, args, report_writer)
+    finally:
+        if report_writer:
+            report_writer.close()
+    print(f"\n{sum(result['status'] == 'PASSED' for result in results)}/{len(results)} frames PASSED.")
@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+# The modules are imported from the repository root, as the scripts do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import image_processing  # noqa: E402
+
+SAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "samples")
+
+
+@pytest.fixture
+def stub_ocr(monkeypatch):
+    # Tesseract is an external program, so the comparisons run by the tests read no text from the captures
+    monkeypatch.setattr(image_processing, "getTextFromImage", lambda image: "")
+    monkeypatch.setattr(image_processing, "listTextPixelsFromImage", lambda image: [])
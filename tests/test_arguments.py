@@ -0,0 +1,26 @@
+import batch
+import daemon
+import main
+import sequence
+
+COMPARISON_OPTIONS = ["--cluster-distance", "8", "--app-rows-only", "--tile-memory-mb", "16", "--memory-report", "--memory-budget-mb", "200", "--no-annotations"]
+PAIR_OPTIONS = ["--cache-dir", "cache", "--cross-density", "--min-feature", "12"]
+EXPECTED = {
+    "cluster_distance": 8, "app_rows_only": True, "tile_memory_mb": 16.0, "memory_report": True, "memory_budget_mb": 200.0, "no_annotations": True,
+    "cache_dir": "cache", "cross_density": True, "min_feature": 12
+}
+
+
+def test_entry_points_share_the_comparison_options():
+    parsed = [
+        main.parseArguments(["b.png", "b.xml", "a.png", "a.xml", "com.example", "output"] + COMPARISON_OPTIONS + PAIR_OPTIONS),
+        batch.parseArguments(["manifest.jsonl"] + COMPARISON_OPTIONS + PAIR_OPTIONS),
+        daemon.parseArguments(COMPARISON_OPTIONS + PAIR_OPTIONS),
+    ]
+    for args in parsed:
+        assert {key: getattr(args, key) for key in EXPECTED} == EXPECTED
+
+
+def test_sequence_takes_the_comparison_options_only():
+    args = sequence.parseArguments(["frames.jsonl"] + COMPARISON_OPTIONS)
+    assert {key: getattr(args, key) for key in EXPECTED} == {**EXPECTED, "cache_dir": None, "cross_density": False, "min_feature": 24}
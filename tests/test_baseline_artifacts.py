@@ -0,0 +1,97 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+import compile_baseline
+import main
+from Classes.BaselineArtifacts import BaselineArtifacts
+from Classes.Fingerprint import Fingerprint
+from Classes.Screenshot import Screenshot
+from conftest import SAMPLES
+
+PACKAGE = "com.example.hellofigma"
+
+
+@pytest.fixture
+def sources(tmp_path):
+    # Copies of the baseline sources, so the tests can change or remove them
+    png = tmp_path / "baseline.png"
+    xml = tmp_path / "baseline.xml"
+    shutil.copy(os.path.join(SAMPLES, "baseline", "screenshot_baseline_button.png"), png)
+    shutil.copy(os.path.join(SAMPLES, "baseline", "UIHierarchy_baseline_button.xml"), xml)
+    return png, xml
+
+
+def compileSources(png, xml, directory):
+    args = compile_baseline.parseArguments([str(png), str(xml), PACKAGE, str(directory)])
+    assert compile_baseline.compileBaseline(args)
+
+
+def test_loaded_baseline_equals_the_sources(tmp_path, sources, stub_ocr):
+    png, xml = sources
+    compileSources(png, xml, tmp_path / "compiled")
+    loaded = BaselineArtifacts.load(str(tmp_path / "compiled"), PACKAGE)
+    baseline = main.setSource("baseline", str(png), str(xml), PACKAGE)
+
+    assert loaded["dimension"] == baseline["dimension"]
+    assert loaded["image"].mode == "RGB"
+    assert np.array_equal(np.asarray(loaded["image"]), np.asarray(baseline["image"].convert("RGB")))
+    assert loaded["fingerprint"] == Fingerprint(baseline["image"], baseline["uihierarchy"])
+    components = baseline["uihierarchy"].list_all_components()
+    loaded_components = loaded["uihierarchy"].list_all_components()
+    assert [component.bounds for component in loaded_components] == [component.bounds for component in components]
+    assert [component.properties for component in loaded_components] == [component.properties for component in components]
+    for component, loaded_component in zip(components, loaded_components):
+        if component.bounds:
+            analysis = Screenshot(baseline["image"], component.bounds, component.children).getAnalysis()
+            assert {key: value for key, value in loaded_component.analysis.items() if key != "text_pixels"} == analysis
+
+
+def test_manifest_stores_absolute_sources(tmp_path, sources, stub_ocr, monkeypatch):
+    png, xml = sources
+    monkeypatch.chdir(tmp_path)
+    compileSources(png.name, xml.name, "compiled")
+    manifest = BaselineArtifacts.load(str(tmp_path / "compiled"))["manifest"]
+    assert (manifest["png"], manifest["xml"]) == (str(png), str(xml))
+
+    # The sources are still checked when the artifacts are loaded from another folder
+    monkeypatch.chdir(SAMPLES)
+    with open(xml, "a", encoding="utf-8") as file:
+        file.write("\n")
+    with pytest.raises(ValueError, match="stale"):
+        BaselineArtifacts.load(str(tmp_path / "compiled"))
+
+
+@pytest.mark.parametrize("changed", ["png", "xml"])
+def test_changed_source_is_rejected(tmp_path, sources, stub_ocr, changed):
+    png, xml = sources
+    compileSources(png, xml, tmp_path / "compiled")
+    source = png if changed == "png" else xml
+    with open(source, "ab") as file:
+        file.write(b"\0")
+    with pytest.raises(ValueError, match=f"stale, {source} changed"):
+        BaselineArtifacts.load(str(tmp_path / "compiled"), PACKAGE)
+
+
+def test_missing_source_is_reported(tmp_path, sources, stub_ocr, capsys):
+    png, xml = sources
+    compileSources(png, xml, tmp_path / "compiled")
+    os.remove(png)
+    capsys.readouterr()
+    assert BaselineArtifacts.load(str(tmp_path / "compiled"), PACKAGE)["dimension"] == (720, 1280)
+    assert f"Warning: {png} is not available" in capsys.readouterr().out
+
+
+def test_other_package_and_format_are_rejected(tmp_path, sources, stub_ocr):
+    png, xml = sources
+    compileSources(png, xml, tmp_path / "compiled")
+    with pytest.raises(ValueError, match="com.example.hellofigma, not com.example.other"):
+        BaselineArtifacts.load(str(tmp_path / "compiled"), "com.example.other")
+    manifest = BaselineArtifacts._readJson(str(tmp_path / "compiled"), "manifest.json")
+    BaselineArtifacts._writeJson(str(tmp_path / "compiled"), "manifest.json", dict(manifest, version=2))
+    with pytest.raises(ValueError, match="compile it again"):
+        BaselineArtifacts.load(str(tmp_path / "compiled"))
+    with pytest.raises(FileNotFoundError):
+        BaselineArtifacts.load(str(tmp_path / "missing"))
@@ -0,0 +1,88 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import batch
+import merge_shards
+from conftest import SAMPLES
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def makeJobs(count, with_ids=True):
+    jobs = []
+    for index in range(count):
+        job = {"baseline_png": f"b{index}.png", "baseline_xml": f"b{index}.xml", "actual_png": f"a{index}.png", "actual_xml": f"a{index}.xml"}
+        if with_ids:
+            job["id"] = f"pair-{index}"
+        jobs.append(job)
+    return jobs
+
+
+@pytest.mark.parametrize("with_ids", [True, False])
+@pytest.mark.parametrize("count", [1, 2, 3, 7])
+def test_shards_partition_the_jobs(count, with_ids):
+    jobs = batch.numberJobs(makeJobs(50, with_ids))
+    shards = [batch.selectShard(jobs, index, count) for index in range(1, count + 1)]
+    keys = [batch.jobKey(job) for shard in shards for job in shard]
+    assert sorted(keys) == sorted(batch.jobKey(job) for job in jobs)
+    for shard in shards:
+        # Each shard keeps the manifest order
+        assert shard == [job for job in jobs if job in shard]
+
+
+def test_shard_does_not_depend_on_manifest_order():
+    jobs = makeJobs(30)
+    shard = batch.selectShard(jobs, 2, 3)
+    assert sorted(batch.jobKey(job) for job in batch.selectShard(jobs[::-1], 2, 3)) == sorted(batch.jobKey(job) for job in shard)
+
+
+def test_parse_shard():
+    assert batch.parseShard("2/5") == (2, 5)
+    for shard in ["0/3", "4/3", "1", "a/b", "1/2/3"]:
+        with pytest.raises(argparse.ArgumentTypeError):
+            batch.parseShard(shard)
+
+
+def test_jobs_without_id_are_numbered_by_position():
+    job = makeJobs(1, with_ids=False)[0]
+    jobs = batch.numberJobs([job, {"id": "named", **job}, dict(job)])
+    assert [batch.jobKey(job) for job in jobs] == ["job-1", "named", "job-3"]
+    args = argparse.Namespace(output="out")
+    assert batch.jobOutput(jobs[0], args) != batch.jobOutput(jobs[2], args)
+    assert job == makeJobs(1, with_ids=False)[0]
+
+
+def test_sharded_runs_merge_into_the_unsharded_results(tmp_path):
+    baseline = {"baseline_png": os.path.join(SAMPLES, "baseline", "screenshot_baseline_button.png"),
+                "baseline_xml": os.path.join(SAMPLES, "baseline", "UIHierarchy_baseline_button.xml")}
+    identical = {**baseline, "actual_png": baseline["baseline_png"], "actual_xml": baseline["baseline_xml"]}
+    jobs = [identical, identical, {"id": "named", **identical}, {"id": "missing", **identical, "actual_png": str(tmp_path / "missing.png")}]
+    jobs += [dict(identical) for _ in range(4)]
+    manifest = tmp_path / "manifest.jsonl"
+    manifest.write_text("".join(json.dumps(job) + "\n" for job in jobs), encoding="utf-8")
+
+    def runBatch(*args):
+        return subprocess.Popen([sys.executable, os.path.join(ROOT, "batch.py"), str(manifest), "--app-package", "com.example.hellofigma", *args],
+                                cwd=tmp_path, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+
+    processes = [runBatch("--shard", f"{index}/3", "--output", f"shard-{index}") for index in range(1, 4)]
+    processes.append(runBatch("--report", "all.jsonl", "--output", "all"))
+    for process in processes:
+        _, errors = process.communicate(timeout=300)
+        assert process.returncode == 0, errors
+
+    summary = merge_shards.mergeShards([str(tmp_path / f"shard-{index}-of-3.jsonl") for index in range(1, 4)], str(tmp_path / "merged.jsonl"))
+    assert (summary["missing_shards"], summary["incomplete_shards"], summary["duplicated_jobs"]) == ([], [], [])
+
+    def results(filepath):
+        return {record["id"]: record["status"] for record in merge_shards.readShard(filepath) if record["type"] == "result"}
+
+    expected = {"job-1": "PASSED", "job-2": "PASSED", "named": "PASSED", "missing": "ERROR", **{f"job-{index}": "PASSED" for index in range(5, 9)}}
+    assert results(str(tmp_path / "all.jsonl")) == expected
+    assert results(str(tmp_path / "merged.jsonl")) == expected
+    assert summary["jobs"] == len(jobs) and summary["statuses"] == {"PASSED": 7, "ERROR": 1}
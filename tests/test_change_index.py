@@ -0,0 +1,46 @@
+import cv2
+import numpy as np
+from PIL import Image
+
+import image_processing
+from Classes.Comparators.ChangeIndex import ChangeIndex
+from Classes.Comparators.ImageComparison import DIFF_THRESHOLD
+
+
+def drawBlocks(rng, size):
+    # Random colored blocks on a white screen, with shades near the diff threshold
+    width, height = size
+    image = np.full((height, width, 3), 255, np.uint8)
+    for _ in range(12):
+        x, y = int(rng.integers(0, width)), int(rng.integers(0, height))
+        image[y:y + int(rng.integers(1, 15)), x:x + int(rng.integers(1, 15))] = rng.integers(200, 256, 3)
+    return image
+
+
+def countByMasking(baseline, actual, baseline_bounds, actual_bounds, excluded_bounds):
+    # Reference: compares the full-size images showing only the bounds, with the excluded bounds masked
+    baseline_image = image_processing.addMask(image_processing.addHighlight(baseline, [baseline_bounds]), excluded_bounds)
+    actual_image = image_processing.addMask(image_processing.addHighlight(actual, [actual_bounds]), excluded_bounds)
+    diff = cv2.cvtColor(cv2.absdiff(np.asarray(baseline_image), np.asarray(actual_image)), cv2.COLOR_BGR2GRAY)
+    return int(np.count_nonzero(diff > DIFF_THRESHOLD))
+
+
+def randomBounds(rng, size):
+    width, height = size
+    # Some bounds go past the right and bottom borders
+    x1, y1 = int(rng.integers(0, width)), int(rng.integers(0, height))
+    return (x1, y1, x1 + int(rng.integers(1, 30)), y1 + int(rng.integers(1, 30)))
+
+
+def test_count_changes_matches_masked_comparison():
+    rng = np.random.default_rng(0)
+    size = (40, 30)
+    for _ in range(30):
+        baseline = Image.fromarray(drawBlocks(rng, size))
+        actual = Image.fromarray(drawBlocks(rng, size))
+        index = ChangeIndex(baseline, actual)
+        for _ in range(10):
+            baseline_bounds, actual_bounds = randomBounds(rng, size), randomBounds(rng, size)
+            excluded_bounds = [randomBounds(rng, size) for _ in range(int(rng.integers(0, 4)))]
+            expected = countByMasking(baseline, actual, baseline_bounds, actual_bounds, excluded_bounds)
+            assert index.countChanges(baseline_bounds, actual_bounds, excluded_bounds) == expected
@@ -0,0 +1,36 @@
+import os
+
+from Classes.Comparators.ImageComparison import ImageComparison
+from Classes.UIHierarchy import UIHierarchy
+
+SAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "samples")
+
+
+def cluster(boxes, distance, uihierarchies=None):
+    comparison = ImageComparison(None, None, distance, uihierarchies)
+    return sorted(comparison._clusterBoundingBoxes(boxes))
+
+
+def test_clustering_is_optional():
+    boxes = [(300, 80, 5, 5), (310, 80, 5, 5)]
+    assert cluster(boxes, None) == boxes
+
+
+def test_close_boxes_of_the_same_leaf_are_merged():
+    uihierarchy = UIHierarchy(os.path.join(SAMPLES, "baseline", "UIHierarchy_baseline_button.xml"))
+    # Both boxes lie in the TextView [280,77][441,115]
+    assert cluster([(300, 80, 5, 5), (310, 80, 5, 5)], 10, [uihierarchy]) == [(300, 80, 15, 5)]
+
+
+def test_close_boxes_of_different_leaves_stay_apart():
+    uihierarchy = UIHierarchy(os.path.join(SAMPLES, "baseline", "UIHierarchy_baseline_button.xml"))
+    # The first box only lies in the Button [248,60][473,132], the second one in the TextView inside it
+    boxes = [(270, 80, 5, 5), (282, 80, 5, 5)]
+    assert cluster(boxes, 10) == [(270, 80, 17, 5)]
+    assert cluster(boxes, 10, [uihierarchy]) == boxes
+
+
+def test_far_boxes_of_the_same_leaf_stay_apart():
+    uihierarchy = UIHierarchy(os.path.join(SAMPLES, "baseline", "UIHierarchy_baseline_button.xml"))
+    boxes = [(285, 80, 5, 5), (420, 100, 5, 5)]
+    assert cluster(boxes, 10, [uihierarchy]) == boxes
@@ -0,0 +1,110 @@
+import os
+import random
+
+import pytest
+from PIL import Image, ImageDraw
+
+import image_processing
+import main
+from Classes.Comparators.ChangeIndex import BandedChangeIndex, ChangeIndex
+from Classes.MemoryMonitor import MemoryMonitor
+from Classes.Screenshot import Screenshot
+from conftest import SAMPLES
+
+BASELINE = os.path.join(SAMPLES, "baseline")
+TALL_PACKAGE = "com.example.tall"
+
+
+def loadSample(folder, png, xml):
+    source = main.setSource("sample", os.path.join(folder, png), os.path.join(folder, xml), "com.example.hellofigma")
+    return main.getDocumentImage(source["image"], source["dimension"]), source["uihierarchy"]
+
+
+def node(bounds, cls="android.view.View", children=""):
+    x1, y1, x2, y2 = bounds
+    return (
+        f'<node index="0" text="" resource-id="" class="{cls}" package="{TALL_PACKAGE}" content-desc="" checkable="false" '
+        f'checked="false" clickable="false" enabled="true" focusable="false" focused="false" scrollable="false" '
+        f'long-clickable="false" password="false" selected="false" bounds="[{x1},{y1}][{x2},{y2}]">{children}</node>'
+    )
+
+
+def writeTallPage(folder, name, changed_row=None, width=1080, height=12000, rows=12):
+    # Writes a tall scrolled page of buttons with a label, one of them in another color
+    image = Image.new("RGB", (width, height), (255, 255, 255))
+    draw = ImageDraw.Draw(image)
+    items = ""
+    for row in range(rows):
+        top = row * (height // rows)
+        button = (80, top + 100, width - 80, top + 300)
+        label = (200, top + 160, width - 200, top + 240)
+        draw.rectangle((button[0], button[1], button[2] - 1, button[3] - 1), fill=(200, 40, 40) if row == changed_row else (40, 40, 200))
+        draw.rectangle((label[0], label[1], label[2] - 1, label[3] - 1), fill=(250, 250, 250))
+        items += node((0, top, width, top + height // rows), children=node(button, "android.widget.Button", node(label, "android.widget.TextView")))
+    png, xml = os.path.join(folder, f"{name}.png"), os.path.join(folder, f"{name}.xml")
+    image.save(png)
+    with open(xml, "w", encoding="utf-8") as file:
+        file.write("<?xml version='1.0' encoding='UTF-8' standalone='yes' ?><hierarchy rotation=\"0\">" + node(
+            (0, 0, width, height), "android.widget.FrameLayout", node((0, 0, width, height), "android.widget.ScrollView", items)
+        ) + "</hierarchy>")
+    return png, xml
+
+
+@pytest.mark.parametrize("band_height", [1, 7, 100])
+def test_banded_counts_equal_summed_area_counts(band_height):
+    baseline, _ = loadSample(BASELINE, "screenshot_baseline_button.png", "UIHierarchy_baseline_button.xml")
+    actual, _ = loadSample(os.path.join(SAMPLES, "size_button"), "screenshot_actual_button.png", "UIHierarchy_actual_button.xml")
+    index = ChangeIndex(baseline, actual)
+    banded = BandedChangeIndex(baseline, actual, band_height)
+    randomizer = random.Random(band_height)
+    width, height = baseline.size
+
+    def randomBounds():
+        x1, y1 = randomizer.randrange(-20, width), randomizer.randrange(-20, height // 4)
+        return (x1, y1, x1 + randomizer.randrange(1, 400), y1 + randomizer.randrange(1, 200))
+
+    cases = [((0, 0, width, height), (0, 0, width, height), [])]
+    cases += [(randomBounds(), randomBounds(), [randomBounds() for _ in range(randomizer.randrange(3))]) for _ in range(40)]
+    for baseline_bounds, actual_bounds, excluded in cases:
+        expected = index.countChanges(baseline_bounds, actual_bounds, excluded)
+        assert banded.countChanges(baseline_bounds, actual_bounds, excluded) == expected
+    assert index.countChanges(*cases[0])
+
+
+def test_padded_crop_analysis_equals_whole_capture_analysis(stub_ocr):
+    image, uihierarchy = loadSample(os.path.join(SAMPLES, "shape_button"), "screenshot_actual_button.png", "UIHierarchy_actual_button.xml")
+    shapes = []
+    for component in uihierarchy.list_all_components():
+        if not component.bounds:
+            continue
+        screenshot = Screenshot(image, component.bounds, component.children, keep_images=False)
+        whole = image_processing.addHighlight(image, [component.bounds])
+        shapes.append(screenshot.shape)
+        assert screenshot.shape == image_processing.getImageContentShape(whole)
+        assert screenshot.colors == image_processing.getColorsFromImage(whole.crop(component.bounds))
+        assert screenshot.image.size[0] <= whole.size[0] and screenshot.image.size[1] <= whole.size[1]
+    assert any(shapes)
+
+
+def test_screenshot_builds_images_on_first_use(stub_ocr):
+    image, uihierarchy = loadSample(BASELINE, "screenshot_baseline_button.png", "UIHierarchy_baseline_button.xml")
+    root = uihierarchy.list_all_components()[1]
+    screenshot = Screenshot(image, root.bounds, root.children, keep_images=False)
+    assert (screenshot._image, screenshot._image_without_children, screenshot._cropped_image) == (None, None, None)
+    assert screenshot.getProperties()["Size"] == (720, 1280)
+    assert (screenshot._image, screenshot._image_without_children, screenshot._cropped_image) == (None, None, None)
+    kept = Screenshot(image, root.bounds, root.children)
+    assert kept.image is kept.image and kept.cropped_image is kept.cropped_image
+
+
+def test_tall_page_memory_is_bounded_after_the_difference(tmp_path, stub_ocr):
+    baseline = main.setSource("baseline", *writeTallPage(str(tmp_path), "baseline"), TALL_PACKAGE)
+    actual = main.setSource("actual", *writeTallPage(str(tmp_path), "actual", changed_row=7), TALL_PACKAGE)
+    memory_monitor = MemoryMonitor()
+    report = main.compare(baseline, actual, str(tmp_path), annotations=False, tile_memory_mb=16, memory_monitor=memory_monitor)
+
+    assert [tip["UI Component on Baseline"]["bounds"] for tip in report["tips"]] == [[80, 7100, 1000, 7300]]
+    stages = memory_monitor.getReport()["stages"]
+    assert [stage["stage"] for stage in stages] == ["compare_screens", "correlate", "component_screenshots", "difference_zones", "classify"]
+    # A single full-page copy of the 1080x12000 capture takes 49 MB
+    assert all(stage["used_rss_mb"] < 32 for stage in stages), stages
@@ -0,0 +1,138 @@
+import http.client
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+import daemon
+from conftest import SAMPLES
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PNG = os.path.join(SAMPLES, "baseline", "screenshot_baseline_button.png")
+BASELINE_XML = os.path.join(SAMPLES, "baseline", "UIHierarchy_baseline_button.xml")
+JOB = {"baseline_png": BASELINE_PNG, "baseline_xml": BASELINE_XML, "actual_png": BASELINE_PNG, "actual_xml": BASELINE_XML}
+
+
+def stubJob(job_id, job, defaults):
+    # Streams one record per step of the job instead of running a comparison, or kills its worker
+    if job.get("crash"):
+        os.kill(os.getpid(), signal.SIGKILL)
+    for step in range(job.get("steps", 1)):
+        time.sleep(job.get("delay", 0))
+        daemon.worker_results.put((job_id, json.dumps({"type": "step", "step": step}) + "\n"))
+    daemon.worker_results.put((job_id, None))
+
+
+@pytest.fixture
+def server():
+    args = daemon.parseArguments(["--host", "127.0.0.1", "--port", "0", "--workers", "1"])
+    server = daemon.createServer(args, daemon.ComparisonService(args, args.workers, run_job=stubJob))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    server.service.close()
+
+
+def request(server, method, path, body=None):
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=30)
+    connection.request(method, path, body=json.dumps(body) if body is not None else None)
+    response = connection.getresponse()
+    data = response.read().decode("utf-8")
+    connection.close()
+    return response.status, data
+
+
+def compare(server, job):
+    status, data = request(server, "POST", "/compare", job)
+    assert status == 200
+    return [json.loads(line) for line in data.splitlines()]
+
+
+def test_health(server):
+    assert request(server, "GET", "/health") == (200, json.dumps({"status": "ok"}))
+
+
+def test_unknown_endpoint_and_invalid_job(server):
+    assert request(server, "GET", "/jobs")[0] == 404
+    status, data = request(server, "POST", "/compare", {"actual_png": BASELINE_PNG})
+    assert status == 400 and "actual_xml" in json.loads(data)["error"]
+
+
+def test_streams_the_records_of_a_job_in_order(server):
+    records = compare(server, dict(JOB, steps=3))
+    assert records == [{"type": "step", "step": 0}, {"type": "step", "step": 1}, {"type": "step", "step": 2}]
+
+
+def test_concurrent_jobs_get_their_own_records(server):
+    results = {}
+
+    def run(steps):
+        results[steps] = compare(server, dict(JOB, steps=steps, delay=0.01))
+
+    threads = [threading.Thread(target=run, args=(steps,)) for steps in (1, 2, 3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert {steps: len(records) for steps, records in results.items()} == {1: 1, 2: 2, 3: 3}
+
+
+def test_metrics_count_the_jobs(server):
+    for _ in range(3):
+        compare(server, JOB)
+    status, data = request(server, "GET", "/metrics")
+    metrics = json.loads(data)
+    assert status == 200
+    assert (metrics["workers"], metrics["in_flight"], metrics["queue_depth"], metrics["completed"], metrics["failed"]) == (1, 0, 0, 3, 0)
+    latency = metrics["latency_seconds"]
+    assert 0 < latency["p50"] <= latency["p90"] <= latency["p99"]
+
+
+def test_metrics_percentiles(server):
+    service = server.service
+    assert service.metrics()["latency_seconds"] == {"p50": None, "p90": None, "p99": None}
+    with service.lock:
+        service.latencies.extend(float(latency) for latency in reversed(range(1, 101)))
+    assert service.metrics()["latency_seconds"] == {"p50": 51.0, "p90": 91.0, "p99": 100.0}
+
+
+def test_killed_worker_ends_its_stream(server):
+    records = compare(server, dict(JOB, crash=True))
+    assert len(records) == 1 and records[0]["type"] == "error"
+    # The broken pool is restarted by the next request, which is refused so the client retries
+    status, data = request(server, "POST", "/compare", JOB)
+    if status == 503:
+        assert "restarted" in json.loads(data)["error"]
+    assert compare(server, JOB) == [{"type": "step", "step": 0}]
+    metrics = server.service.metrics()
+    assert metrics["failed"] >= 1 and metrics["pool_restarts"] == 1
+
+
+def test_process_group_termination_stops_cleanly(tmp_path):
+    process = subprocess.Popen(
+        [sys.executable, "-u", os.path.join(ROOT, "daemon.py"), "--port", "0", "--workers", "2", "--output", str(tmp_path)],
+        cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, start_new_session=True
+    )
+    try:
+        port = int(process.stdout.readline().strip().rsplit(":", 1)[1])
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+        connection.request("POST", "/compare", body=json.dumps(dict(JOB, id="identical", app_package="com.example.hellofigma")))
+        records = [json.loads(line) for line in connection.getresponse().read().decode("utf-8").splitlines()]
+        connection.close()
+        assert records[-1]["type"] == "summary" and records[-1]["status"] == "PASSED"
+        # A stop sent to the whole process group also reaches the workers, which leave the shutdown to the daemon
+        os.killpg(process.pid, signal.SIGTERM)
+        _, errors = process.communicate(timeout=60)
+    finally:
+        if process.poll() is None:
+            os.killpg(process.pid, signal.SIGKILL)
+            process.wait()
+    assert process.returncode == 0
+    assert "Traceback" not in errors
@@ -0,0 +1,77 @@
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from Classes.DensityNormalizer import DensityNormalizer
+from Classes.UIHierarchy import UIHierarchy
+from conftest import SAMPLES
+
+GALAXY_NEXUS = os.path.join(SAMPLES, "resize_images", "galaxy_nexus")
+PIXEL5 = os.path.join(SAMPLES, "resize_images", "pixel5")
+
+
+@pytest.fixture
+def sources():
+    baseline = UIHierarchy(os.path.join(GALAXY_NEXUS, "window_dump.xml"))
+    actual = UIHierarchy(os.path.join(PIXEL5, "window_dump.xml"))
+    normalizer = DensityNormalizer(baseline.get_document_dimensions(), actual.get_document_dimensions())
+    return normalizer, baseline, actual
+
+
+def test_working_resolution_is_the_narrower_screen(sources):
+    normalizer, _, _ = sources
+    # 720x1280 and 1080x2340 captures, the second one scaled by 2/3 to 720x1560
+    assert normalizer.getDimension() == (720, 1560)
+    assert (normalizer.baseline_scale, normalizer.actual_scale) == (1, pytest.approx(2 / 3))
+
+
+def test_scale_bounds_maps_the_components_into_the_working_resolution(sources):
+    normalizer, _, actual = sources
+    actual.scale_bounds(normalizer.actual_scale)
+    bounds = [component.bounds for component in actual.list_all_components() if component.bounds]
+    assert bounds[:3] == [(0, 0, 720, 1560), (0, 0, 720, 1516), (0, 91, 720, 1516)]
+    assert bounds[-2:] == [(0, 0, 720, 91), (0, 1516, 720, 1560)]
+    assert all(component.analysis is None for component in actual.list_all_components())
+
+
+def test_normalize_keeps_the_narrower_capture_and_pads_it(sources):
+    normalizer, baseline, _ = sources
+    image = Image.open(os.path.join(GALAXY_NEXUS, "baseline_hello_android.png"))
+    bounds = [component.bounds for component in baseline.list_all_components()]
+    frame = np.asarray(normalizer.normalize(image, baseline, normalizer.baseline_scale))
+    assert frame.shape == (1560, 720, 3)
+    assert np.array_equal(frame[:1280], np.asarray(image)[:, :, :3])
+    assert (frame[1280:] == 255).all()
+    assert [component.bounds for component in baseline.list_all_components()] == bounds
+
+
+def test_normalize_scales_the_wider_capture(sources):
+    normalizer, _, actual = sources
+    image = Image.open(os.path.join(PIXEL5, "actual_hello_android.png"))
+    frame = np.asarray(normalizer.normalize(image, actual, normalizer.actual_scale))
+    assert frame.shape == (1560, 720, 3)
+    # The status bar keeps its color across the scaled rows
+    status_bar = np.asarray(image)[:136, :, :3].reshape(-1, 3)
+    assert np.abs(frame[:91].reshape(-1, 3).mean(axis=0) - status_bar.mean(axis=0)).max() < 2
+    assert next(component for component in actual.list_all_components() if component.bounds).bounds == (0, 0, 720, 1560)
+
+
+def test_normalize_keeps_the_aspect_ratio_of_a_capture_narrower_than_its_document(sources):
+    normalizer, _, actual = sources
+    # A capture of the left half of the screen keeps its width ratio instead of being stretched to the working width
+    image = Image.new("RGB", (540, 2340), (0, 0, 0))
+    frame = np.asarray(normalizer.normalize(image, actual, normalizer.actual_scale))
+    assert frame.shape == (1560, 720, 3)
+    assert (frame[:, :360] == 0).all()
+    assert (frame[:, 360:] == 255).all()
+
+
+def test_pyramid_level_follows_the_smallest_component(sources):
+    normalizer, baseline, actual = sources
+    actual.scale_bounds(normalizer.actual_scale)
+    # The 44 px high navigation bar of the scaled actual screen is the smallest component
+    assert normalizer.getPyramidLevel([baseline, actual]) == 0
+    assert DensityNormalizer((720, 1280), (720, 1280), min_feature=20).getPyramidLevel([baseline, actual]) == 1
+    assert DensityNormalizer((720, 1280), (720, 1280), min_feature=10).getPyramidLevel([baseline, actual]) == 2
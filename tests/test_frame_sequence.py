@@ -0,0 +1,62 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+from Classes.Comparators.ImageComparison import ImageComparison
+from Classes.FrameSequence import FrameSequence
+from Classes.UIHierarchy import UIHierarchy
+from conftest import SAMPLES
+
+UIHIERARCHY = os.path.join(SAMPLES, "baseline", "UIHierarchy_baseline_button.xml")
+
+
+def drawFrames(seed, frames=12, width=160, height=240):
+    # Animates shapes that move, grow, appear and vanish on both sides, so the differences split, join and nest across frames
+    rng = np.random.default_rng(seed)
+    shapes = [
+        [int(rng.integers(0, 2)), int(rng.integers(0, width)), int(rng.integers(0, height)), int(rng.integers(2, 30)), int(rng.integers(2, 30)), int(rng.integers(0, 4))]
+        for _ in range(int(rng.integers(3, 12)))
+    ]
+    for _ in range(frames):
+        sides = [np.full((height, width, 3), 255, np.uint8), np.full((height, width, 3), 255, np.uint8)]
+        for side, x, y, w, h, kind in shapes:
+            for image in (sides if side == 0 else sides[1:]):
+                if kind == 0:
+                    cv2.rectangle(image, (x, y), (x + w, y + h), (0, 0, 0), 1)
+                elif kind == 1:
+                    cv2.rectangle(image, (x, y), (x + w, y + h), (40, 40, 200), -1)
+                elif kind == 2:
+                    cv2.circle(image, (x, y), w, (0, 0, 0), 1)
+                else:
+                    image[y, x] = 0
+        yield Image.fromarray(sides[0]), Image.fromarray(sides[1])
+        for shape in shapes:
+            if rng.random() < 0.4:
+                shape[1] = int(np.clip(shape[1] + rng.integers(-8, 9), 0, width - 1))
+                shape[2] = int(np.clip(shape[2] + rng.integers(-8, 9), 0, height - 1))
+            if rng.random() < 0.2:
+                shape[3] = int(rng.integers(2, 30))
+            if rng.random() < 0.1:
+                shape[0] = 1 - shape[0]
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_incremental_boxes_equal_a_full_recompute(seed):
+    uihierarchy = UIHierarchy(UIHIERARCHY)
+    frame_sequence = FrameSequence()
+    incremental_frames = 0
+    for baseline, actual in drawFrames(seed):
+        frame_sequence.startFrame({"image": baseline, "uihierarchy": uihierarchy}, {"image": actual, "uihierarchy": uihierarchy})
+        incremental_frames += frame_sequence.dirty_regions is not None
+        incremental = ImageComparison(baseline, actual, previous_boxes=frame_sequence.previous_boxes, dirty_regions=frame_sequence.dirty_regions)
+        incremental.areSame()
+        full = ImageComparison(baseline, actual)
+        full.areSame()
+        assert incremental.raw_boxes == full.raw_boxes
+        frame_sequence.setDifferenceBoxes(incremental.raw_boxes)
+        frame_sequence.endFrame({})
+    # Every frame after the first one is compared incrementally
+    assert incremental_frames == 11
@@ -0,0 +1,63 @@
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+from Classes.Comparators.ImageComparison import ImageComparison
+
+
+def drawChanges(seed):
+    # Draws random outlines, rings, lines and dots on a blank screen, so some changes nest in the holes of others
+    rng = np.random.default_rng(seed)
+    height, width = int(rng.integers(20, 120)), int(rng.integers(20, 120))
+    baseline = np.full((height, width, 3), 255, np.uint8)
+    actual = baseline.copy()
+    for _ in range(int(rng.integers(1, 15))):
+        kind = rng.integers(0, 4)
+        x, y = int(rng.integers(0, width)), int(rng.integers(0, height))
+        if kind == 0:
+            cv2.rectangle(actual, (x, y), (x + int(rng.integers(1, 30)), y + int(rng.integers(1, 30))), (0, 0, 0), int(rng.integers(1, 3)))
+        elif kind == 1:
+            cv2.circle(actual, (x, y), int(rng.integers(1, 20)), (0, 0, 0), 1)
+        elif kind == 2:
+            actual[y, x] = 0
+        else:
+            cv2.line(actual, (x, y), (int(rng.integers(0, width)), int(rng.integers(0, height))), (0, 0, 0), 1)
+    if rng.random() < 0.3:
+        actual[rng.random((height, width)) < 0.05] = 0
+    return Image.fromarray(baseline), Image.fromarray(actual)
+
+
+@pytest.mark.parametrize("pyramid_level", [0, 1, 2])
+@pytest.mark.parametrize("band_height", [1, 2, 3, 8, 17])
+def test_tiled_boxes_equal_untiled_boxes(pyramid_level, band_height):
+    for seed in range(60):
+        baseline, actual = drawChanges(seed)
+        untiled = ImageComparison(baseline, actual, pyramid_level=pyramid_level)
+        untiled.areSame()
+        tiled = ImageComparison(baseline, actual, pyramid_level=pyramid_level, band_height=band_height)
+        tiled.areSame()
+        assert tiled.raw_boxes == untiled.raw_boxes, f"seed {seed}"
+
+
+def test_boxes_touching_at_a_seam_stay_apart():
+    # The boxes of two changes touch at the band border but their pixels are not connected, not even diagonally
+    baseline = np.full((8, 10, 3), 255, np.uint8)
+    actual = baseline.copy()
+    actual[2, 1:7] = 0
+    actual[3, 1] = 0
+    actual[4:6, 6] = 0
+    tiled = ImageComparison(Image.fromarray(baseline), Image.fromarray(actual), band_height=4)
+    tiled.areSame()
+    assert sorted(tiled.raw_boxes) == [(1, 2, 6, 2), (6, 4, 1, 2)]
+
+
+def test_change_in_a_hole_across_a_seam_has_no_box():
+    # A dot inside a ring cut by the band border only gets a box on its own without tiling
+    baseline = np.full((12, 12, 3), 255, np.uint8)
+    actual = baseline.copy()
+    cv2.rectangle(actual, (1, 1), (10, 10), (0, 0, 0), 1)
+    actual[5, 5] = 0
+    tiled = ImageComparison(Image.fromarray(baseline), Image.fromarray(actual), band_height=5)
+    tiled.areSame()
+    assert tiled.raw_boxes == [(1, 1, 10, 10)]
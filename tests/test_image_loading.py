@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+import image_processing
+
+
+def writeRaw(path, frame, header_size=16, pixel_format=image_processing.RAW_FORMAT_RGBA_8888):
+    # Writes a raw framebuffer dump as 'screencap': width, height, format and, on Android 9+, colorspace
+    height, width = frame.shape[:2]
+    header = np.array([width, height, pixel_format, 1][:header_size // 4], dtype="<u4")
+    with open(path, "wb") as file:
+        file.write(header.tobytes())
+        file.write(frame.tobytes())
+    return str(path)
+
+
+def makeFrame(width=6, height=5):
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 256, (height, width, 4), dtype=np.uint8)
+
+
+@pytest.mark.parametrize("header_size", [12, 16])
+def test_raw_framebuffer_is_mapped_after_its_header(tmp_path, header_size):
+    frame = makeFrame()
+    raw = image_processing.readRawFramebuffer(writeRaw(tmp_path / "capture.raw", frame, header_size))
+    assert isinstance(raw, np.memmap)
+    assert np.array_equal(raw, frame)
+
+
+def test_raw_framebuffer_with_unsupported_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="pixel format"):
+        image_processing.readRawFramebuffer(writeRaw(tmp_path / "capture.raw", makeFrame(), pixel_format=4))
+
+
+def test_raw_framebuffer_not_matching_its_header_is_rejected(tmp_path):
+    path = writeRaw(tmp_path / "capture.raw", makeFrame())
+    with open(path, "ab") as file:
+        file.write(b"\0" * 8)
+    with pytest.raises(ValueError, match="does not match"):
+        image_processing.readRawFramebuffer(path)
+
+
+def test_truncated_raw_framebuffer_header_is_rejected(tmp_path):
+    path = tmp_path / "capture.raw"
+    path.write_bytes(b"\1\0\0\0")
+    with pytest.raises(ValueError, match="header"):
+        image_processing.readRawFramebuffer(str(path))
+
+
+def test_raw_and_png_captures_load_the_same_pixels(tmp_path):
+    frame = makeFrame()
+    frame[..., 3] = 255
+    Image.fromarray(frame[..., :3]).save(tmp_path / "capture.png")
+    raw, raw_top, raw_size = image_processing.loadImage(writeRaw(tmp_path / "capture.raw", frame))
+    png, png_top, png_size = image_processing.loadImage(str(tmp_path / "capture.png"))
+    assert (raw_top, raw_size) == (png_top, png_size) == (0, (6, 5))
+    assert np.array_equal(raw[..., :3], png)
+
+
+@pytest.mark.parametrize("rows, expected", [((1, 3), (1, 3)), ((-2, 2), (0, 2)), ((4, 9), (4, 5)), ((7, 9), (5, 5))])
+def test_load_image_rows_returns_the_clipped_band(tmp_path, rows, expected):
+    frame = makeFrame()
+    band, top, size = image_processing.loadImage(writeRaw(tmp_path / "capture.raw", frame), rows)
+    assert (top, size) == (expected[0], (6, 5))
+    assert np.array_equal(band, frame[expected[0]:expected[1]])
+
+
+def test_band_is_masked_into_a_white_frame(tmp_path):
+    frame = makeFrame()
+    band, top, size = image_processing.loadImage(writeRaw(tmp_path / "capture.raw", frame), (1, 3))
+    image = np.asarray(image_processing.addMask(band, [(0, 1, 1, 1)], size, top))
+    expected = np.full((5, 6, 3), 255, np.uint8)
+    expected[1:3] = frame[1:3, :, :3]
+    expected[1, 0:2] = 255
+    assert np.array_equal(image, expected)
@@ -0,0 +1,87 @@
+import numpy as np
+from PIL import Image, ImageDraw
+
+import image_processing
+import main
+
+
+def test_rectangles_union_covers_each_pixel_once():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        width, height = int(rng.integers(1, 40)), int(rng.integers(1, 40))
+        rectangles = []
+        for _ in range(int(rng.integers(0, 8))):
+            x1, y1 = int(rng.integers(-5, width + 5)), int(rng.integers(-5, height + 5))
+            rectangles.append((x1, y1, x1 + int(rng.integers(-2, 20)), y1 + int(rng.integers(-2, 20))))
+
+        # Reference: paints every rectangle, with inclusive ends, on a mask of the image
+        expected = np.zeros((height, width), dtype=bool)
+        for x1, y1, x2, y2 in rectangles:
+            expected[max(0, y1):max(0, y2 + 1), max(0, x1):max(0, x2 + 1)] = True
+
+        union, count = image_processing.getRectanglesUnion(rectangles, (width, height))
+        painted = np.zeros((height, width), dtype=np.int32)
+        for x1, y1, x2, y2 in union:
+            painted[y1:y2, x1:x2] += 1
+        assert painted.max(initial=0) <= 1
+        assert np.array_equal(painted.astype(bool), expected)
+        assert count == int(expected.sum())
+
+
+def referenceMask(image, rectangles):
+    # Reference: draws every rectangle, with inclusive ends, in white on an RGB copy
+    masked = image.convert("RGB")
+    draw = ImageDraw.Draw(masked)
+    for x1, y1, x2, y2 in rectangles:
+        if x1 <= x2 and y1 <= y2:
+            draw.rectangle((x1, y1, x2, y2), fill=(255, 255, 255))
+    return masked
+
+
+def test_mask_paints_the_rectangles_white():
+    rng = np.random.default_rng(1)
+    for _ in range(50):
+        width, height = int(rng.integers(1, 60)), int(rng.integers(1, 60))
+        pixels = rng.integers(0, 256, (height, width, 4), dtype=np.uint8)
+        rectangles = []
+        for _ in range(int(rng.integers(0, 6))):
+            x1, y1 = int(rng.integers(-5, width + 5)), int(rng.integers(-5, height + 5))
+            rectangles.append((x1, y1, x1 + int(rng.integers(0, 30)), y1 + int(rng.integers(0, 30))))
+        expected = np.asarray(referenceMask(Image.fromarray(pixels[:, :, :3]), rectangles))
+
+        assert np.array_equal(np.asarray(image_processing.addMask(Image.fromarray(pixels[:, :, :3]), rectangles)), expected)
+        assert np.array_equal(np.asarray(image_processing.addMask(pixels, rectangles)), expected)
+        assert np.array_equal(np.asarray(image_processing.addMask(pixels[:, :, :3], rectangles)), expected)
+
+
+def test_mask_of_a_band_leaves_the_other_rows_white():
+    band = np.zeros((4, 6, 3), dtype=np.uint8)
+    masked = np.asarray(image_processing.addMask(band, [(0, 5, 1, 5)], size=(6, 10), top=3))
+    assert (masked[:3] == 255).all() and (masked[7:] == 255).all()
+    assert (masked[5, :2] == 255).all() and not masked[5, 2:].any()
+    assert not masked[[3, 4, 6]].any()
+
+
+def test_all_black_check_uses_the_grayscale_value():
+    rng = np.random.default_rng(2)
+    for height in [1, 63, 64, 65, 130]:
+        black = np.zeros((height, 5, 4), dtype=np.uint8)
+        black[:, :, 3] = 255
+        assert image_processing.is_image_all_black(black, rows_per_chunk=64)
+        assert image_processing.is_image_all_black(Image.fromarray(black[:, :, :3]))
+        for _ in range(20):
+            pixels = black.copy()
+            y, x = int(rng.integers(height)), int(rng.integers(5))
+            pixels[y, x, :3] = rng.integers(0, 3, 3)
+            # Dark pixels rounding to 0 in the "L" conversion are black too
+            expected = not np.asarray(Image.fromarray(pixels[:, :, :3]).convert("L")).any()
+            assert image_processing.is_image_all_black(pixels, rows_per_chunk=64) == expected
+            assert image_processing.is_image_all_black(Image.fromarray(pixels[:, :, :3]), rows_per_chunk=64) == expected
+
+
+def test_only_an_unmasked_black_capture_has_no_package(tmp_path):
+    filepath = str(tmp_path / "black.png")
+    Image.new("RGB", (8, 6), (0, 0, 0)).save(filepath)
+    assert main.setScreenshot(filepath, []) is None
+    masked = main.setScreenshot(filepath, [(None, (0, 0, 1, 1))])
+    assert masked is not None and masked.getpixel((0, 0)) == (255, 255, 255) and masked.getpixel((7, 5)) == (0, 0, 0)
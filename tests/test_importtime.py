@@ -0,0 +1,18 @@
+import os
+import subprocess
+import sys
+
+import check_importtime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_entry_points_import_no_heavy_dependency():
+    result = subprocess.run([sys.executable, "check_importtime.py"], cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert all(f"{module}: " in result.stdout for module in check_importtime.ENTRY_POINTS)
+
+
+def test_eager_heavy_import_is_reported():
+    violations = check_importtime.checkImports(["PIL.Image"], budget_ms=10000)
+    assert violations == ["PIL.Image eagerly imports PIL"]
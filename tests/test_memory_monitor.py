@@ -0,0 +1,112 @@
+import io
+import json
+import os
+
+import pytest
+
+import main
+from Classes.MemoryMonitor import MB, MemoryBudgetExceeded, MemoryMonitor
+from Classes.ReportWriter import ReportWriter
+from conftest import SAMPLES
+
+
+class FakeRss:
+    # Current and peak RSS of the process, reset like /proc/self/clear_refs does
+    def __init__(self, current, peak=None):
+        self.current = current
+        self.peak = peak if peak is not None else current
+        self.peak_reads = 0
+
+    def getPeak(self):
+        self.peak_reads += 1
+        return self.peak
+
+    def reset(self):
+        self.peak = self.current
+
+
+@pytest.fixture
+def rss(monkeypatch):
+    rss = FakeRss(200 * MB)
+    monkeypatch.setattr(MemoryMonitor, "getCurrentRss", staticmethod(lambda: rss.current))
+    monkeypatch.setattr(MemoryMonitor, "getPeakRss", staticmethod(rss.getPeak))
+    monkeypatch.setattr(MemoryMonitor, "_resetPeakRss", staticmethod(rss.reset))
+    return rss
+
+
+def test_stages_are_charged_the_growth_since_the_start(rss):
+    memory_monitor = MemoryMonitor(budget_mb=100)
+    rss.peak = 250 * MB
+    memory_monitor.endStage("compare_screens")
+    # The peak is reset after each stage, so a stage is not charged the peak of the previous one
+    rss.current = 150 * MB
+    memory_monitor.endStage("correlate")
+    rss.peak = 300 * MB
+    memory_monitor.endStage("classify")
+
+    assert memory_monitor.getReport() == {
+        "budget_mb": 100.0,
+        "start_rss_mb": 200.0,
+        "stages": [
+            {"stage": "compare_screens", "peak_rss_mb": 250.0, "used_rss_mb": 50.0},
+            {"stage": "correlate", "peak_rss_mb": 200.0, "used_rss_mb": 0.0},
+            {"stage": "classify", "peak_rss_mb": 300.0, "used_rss_mb": 100.0}
+        ]
+    }
+
+
+def test_first_stage_over_the_budget_raises(rss):
+    memory_monitor = MemoryMonitor(budget_mb=100)
+    memory_monitor.endStage("compare_screens")
+    rss.peak = 301 * MB
+    with pytest.raises(MemoryBudgetExceeded, match="stage 'correlate': peak RSS of 101.0 MB") as exception:
+        memory_monitor.endStage("correlate")
+    assert exception.value.stage == "correlate"
+    assert [stage["stage"] for stage in memory_monitor.getReport()["stages"]] == ["compare_screens", "correlate"]
+
+
+def test_memory_held_before_the_comparison_is_not_charged(rss):
+    rss.current = 2000 * MB
+    memory_monitor = MemoryMonitor(budget_mb=100)
+    rss.peak = 2050 * MB
+    memory_monitor.endStage("compare_screens")
+    assert memory_monitor.getReport()["stages"][0]["used_rss_mb"] == 50.0
+
+
+def test_unavailable_rss_is_not_checked(rss, monkeypatch):
+    monkeypatch.setattr(MemoryMonitor, "getCurrentRss", staticmethod(lambda: None))
+    memory_monitor = MemoryMonitor(budget_mb=1)
+    # The peak so far is the start when the current RSS is not available
+    assert memory_monitor.start_rss == 200 * MB
+    rss.peak = None
+    memory_monitor.endStage("compare_screens")
+    assert memory_monitor.getReport()["stages"] == [{"stage": "compare_screens", "peak_rss_mb": None, "used_rss_mb": None}]
+
+
+def test_disabled_monitor_records_nothing(rss):
+    memory_monitor = MemoryMonitor(budget_mb=1, enabled=False)
+    rss.peak = 1000 * MB
+    memory_monitor.endStage("compare_screens")
+    assert memory_monitor.getReport() == {"budget_mb": None, "start_rss_mb": 0.0, "stages": []}
+    assert rss.peak_reads == 0
+
+
+def test_pair_over_the_budget_saves_no_annotated_images(tmp_path, rss, stub_ocr, monkeypatch):
+    args = main.parseArguments([
+        os.path.join(SAMPLES, "baseline", "screenshot_baseline_button.png"), os.path.join(SAMPLES, "baseline", "UIHierarchy_baseline_button.xml"),
+        os.path.join(SAMPLES, "color_button", "screenshot_actual_button.png"), os.path.join(SAMPLES, "color_button", "UIHierarchy_actual_button.xml"),
+        "com.example.hellofigma", str(tmp_path), "--memory-budget-mb", "100"
+    ])
+    # The screens are compared within the budget, and the next stage goes over it once the annotated images are deferred
+    peaks = iter([rss.current, rss.current + 500 * MB])
+    monkeypatch.setattr(MemoryMonitor, "getPeakRss", staticmethod(lambda: next(peaks)))
+    stream = io.StringIO()
+    report_writer = ReportWriter(stream=stream)
+    report = main.comparePair(args, *main.loadSources(args), report_writer)
+    report_writer.close()
+
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert report["status"] == "OVER_MEMORY_BUDGET"
+    assert records[-1]["status"] == "OVER_MEMORY_BUDGET" and "stage 'correlate'" in records[-1]["error"]
+    assert [stage["stage"] for stage in next(record for record in records if record["type"] == "memory")["stages"]] == ["compare_screens", "correlate"]
+    assert not any(os.path.exists(os.path.join(args.output, name)) for name in main.ANNOTATED_IMAGES)
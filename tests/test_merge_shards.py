@@ -0,0 +1,69 @@
+import json
+
+import batch
+import merge_shards
+
+
+def makeResults(count):
+    statuses = ["PASSED", "FAILED", "ERROR"]
+    return [
+        {"id": f"pair-{index}", "status": statuses[index % 3], "error": None, "load_seconds": 0.25, "compare_seconds": 0.5}
+        for index in range(count)
+    ]
+
+
+def writeShards(tmp_path, results, count):
+    # Writes the shard files as 'batch.py --shard' does, from the results of an unsharded run
+    filepaths = []
+    for index in range(1, count + 1):
+        shard_results = batch.selectShard(results, index, count)
+        records = [{"type": "shard", "shard": index, "shards": count, "manifest": "manifest.jsonl", "jobs": len(shard_results)}]
+        for result in shard_results:
+            records.append({"type": "pair", "baseline": "b.png", "actual": "a.png"})
+            records.append({"type": "result", **result})
+        records.append({"type": "shard_summary", "shard": index, "shards": count, "wall_seconds": 1.0})
+        filepath = tmp_path / f"shard-{index}-of-{count}.jsonl"
+        filepath.write_text("".join(json.dumps(record) + "\n" for record in records), encoding="utf-8")
+        filepaths.append(str(filepath))
+    return filepaths
+
+
+def test_merge_equals_unsharded_results(tmp_path):
+    results = makeResults(40)
+    filepaths = writeShards(tmp_path, results, 3)
+    summary = merge_shards.mergeShards(filepaths[::-1], str(tmp_path / "merged.jsonl"))
+
+    merged = merge_shards.readShard(str(tmp_path / "merged.jsonl"))
+    assert sorted((record for record in merged if record["type"] == "result"), key=lambda record: record["id"]) == sorted(
+        ({"type": "result", **result} for result in results), key=lambda record: record["id"])
+    statuses = {}
+    for result in results:
+        statuses[result["status"]] = statuses.get(result["status"], 0) + 1
+    assert summary["statuses"] == statuses
+    assert summary["jobs"] == len(results)
+    assert summary["timings"]["compare_seconds"] == 0.5 * len(results)
+    assert (summary["missing_shards"], summary["incomplete_shards"], summary["duplicated_jobs"]) == ([], [], [])
+    assert merged[-1] == summary
+
+
+def test_missing_and_interrupted_shards_are_reported(tmp_path):
+    filepaths = writeShards(tmp_path, makeResults(40), 3)
+    # The second shard stopped while writing a record, before its last result and its summary
+    with open(filepaths[1], "r", encoding="utf-8") as file:
+        lines = file.readlines()
+    with open(filepaths[1], "w", encoding="utf-8") as file:
+        file.writelines(lines[:-2])
+        file.write(lines[-2][:10])
+
+    summary = merge_shards.mergeShards(filepaths[:2], str(tmp_path / "merged.jsonl"))
+    assert summary["missing_shards"] == [3]
+    assert summary["incomplete_shards"] == [2]
+
+
+def test_shard_without_summary_is_incomplete(tmp_path):
+    filepaths = writeShards(tmp_path, makeResults(10), 1)
+    with open(filepaths[0], "r", encoding="utf-8") as file:
+        lines = file.readlines()
+    with open(filepaths[0], "w", encoding="utf-8") as file:
+        file.writelines(lines[:-1])
+    assert merge_shards.mergeShards(filepaths, str(tmp_path / "merged.jsonl"))["incomplete_shards"] == [1]
@@ -0,0 +1,36 @@
+import io
+import json
+import os
+
+import pytest
+
+import main
+from Classes.ReportWriter import ReportWriter
+from conftest import SAMPLES
+
+
+def runPair(case, output, cache_dir):
+    args = main.parseArguments([
+        os.path.join(SAMPLES, "baseline", "screenshot_baseline_button.png"), os.path.join(SAMPLES, "baseline", "UIHierarchy_baseline_button.xml"),
+        os.path.join(SAMPLES, case, "screenshot_actual_button.png"), os.path.join(SAMPLES, case, "UIHierarchy_actual_button.xml"),
+        "com.example.hellofigma", str(output), "--cache-dir", str(cache_dir)
+    ])
+    os.makedirs(args.output, exist_ok=True)
+    stream = io.StringIO()
+    report_writer = ReportWriter(stream=stream)
+    main.comparePair(args, *main.loadSources(args), report_writer)
+    report_writer.close()
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+@pytest.mark.parametrize("case", ["color_button", "position_button", "shape_button", "size_button"])
+def test_cached_replay_writes_the_records_of_a_fresh_run(tmp_path, stub_ocr, case):
+    fresh = runPair(case, tmp_path / "fresh", tmp_path / "cache")
+    cached = runPair(case, tmp_path / "cached", tmp_path / "cache")
+
+    assert [record["type"] for record in fresh][-1] == "summary"
+    assert {record["type"] for record in fresh} >= {"pair", "diff_box", "zone", "difference"}
+    assert cached[:-1] == fresh[:-1]
+    assert cached[-1] == {**fresh[-1], "cached": True}
+    for name in main.ANNOTATED_IMAGES:
+        assert (tmp_path / "cached" / name).read_bytes() == (tmp_path / "fresh" / name).read_bytes()
@@ -0,0 +1,60 @@
+import argparse
+import os
+
+import pytest
+from PIL import Image
+
+import main
+from Classes.Fingerprint import Fingerprint
+from Classes.ResultCache import ResultCache
+from Classes.UIHierarchy import UIHierarchy
+
+SAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "samples")
+OPTIONS = {"app_package": "com.example.hellofigma", "cluster_distance": None, "cross_density": False, "min_feature": 24, "tile_memory_mb": None}
+REPORT = {"status": "FAILED", "tips": [], "diff_boxes": [[1, 2, 3, 4]], "zones": {}, "differences": []}
+
+
+@pytest.fixture(scope="module")
+def fingerprints():
+    uihierarchy = UIHierarchy(os.path.join(SAMPLES, "baseline", "UIHierarchy_baseline_button.xml"))
+    return Fingerprint(Image.new("RGB", (8, 8), (255, 255, 255)), uihierarchy), Fingerprint(Image.new("RGB", (8, 8), (0, 0, 0)), uihierarchy)
+
+
+def test_identical_fingerprints_and_options_hit(tmp_path, fingerprints):
+    baseline, actual = fingerprints
+    ResultCache(str(tmp_path), OPTIONS).put(baseline, actual, REPORT)
+    assert ResultCache(str(tmp_path), dict(OPTIONS)).get(baseline, actual) == REPORT
+
+
+def test_other_fingerprints_miss(tmp_path, fingerprints):
+    baseline, actual = fingerprints
+    ResultCache(str(tmp_path), OPTIONS).put(baseline, actual, REPORT)
+    assert ResultCache(str(tmp_path), OPTIONS).get(actual, baseline) is None
+
+
+@pytest.mark.parametrize("option, value", [
+    ("app_package", "com.example.other"), ("cluster_distance", 8), ("cross_density", True), ("min_feature", 12), ("tile_memory_mb", 64)
+])
+def test_changed_analysis_option_misses(tmp_path, fingerprints, option, value):
+    baseline, actual = fingerprints
+    ResultCache(str(tmp_path), OPTIONS).put(baseline, actual, REPORT)
+    assert ResultCache(str(tmp_path), {**OPTIONS, option: value}).get(baseline, actual) is None
+
+
+def test_cache_options_cover_the_comparison_arguments():
+    args = argparse.Namespace(**OPTIONS)
+    assert main.getCacheOptions(args) == OPTIONS
+
+
+def test_images_are_stored_with_the_report(tmp_path, fingerprints):
+    baseline, actual = fingerprints
+    cache = ResultCache(str(tmp_path / "cache"), OPTIONS)
+    source, output = tmp_path / "source", tmp_path / "output"
+    source.mkdir()
+    output.mkdir()
+    assert not cache.getImages(baseline, actual, str(output), main.ANNOTATED_IMAGES)
+    for name in main.ANNOTATED_IMAGES:
+        (source / name).write_bytes(name.encode())
+    cache.putImages(baseline, actual, str(source), main.ANNOTATED_IMAGES)
+    assert cache.getImages(baseline, actual, str(output), main.ANNOTATED_IMAGES)
+    assert all((output / name).read_bytes() == name.encode() for name in main.ANNOTATED_IMAGES)
@@ -0,0 +1,91 @@
+import glob
+import os
+import random
+
+import pytest
+
+import utils
+from Classes.UIHierarchy import UIHierarchy
+from conftest import SAMPLES
+
+SAMPLE_XMLS = sorted(path for path in glob.glob(os.path.join(SAMPLES, "**", "*.xml"), recursive=True) if "alto" not in os.path.basename(path))
+
+
+def collect(component):
+    # Reference: recursive pre-order traversal of a subtree
+    components = [component]
+    for child in component.children:
+        components.extend(collect(child))
+    return components
+
+
+def searchContaining(component, box):
+    # Reference: recursive search of the smallest components containing the box (x1, y1, x2, y2)
+    matching = []
+    if component.bounds and utils.is_contained(box, component.bounds):
+        children_matches = [match for child in component.children for match in searchContaining(child, box)]
+        if children_matches:
+            return children_matches
+        matching.append(component)
+    for child in component.children:
+        matching.extend(searchContaining(child, box))
+    return matching
+
+
+@pytest.fixture(params=SAMPLE_XMLS, ids=lambda path: os.path.relpath(path, SAMPLES))
+def uihierarchy(request):
+    return UIHierarchy(request.param)
+
+
+def test_index_follows_the_tree(uihierarchy):
+    components = collect(uihierarchy.root_component)
+    assert uihierarchy.list_all_components() == components
+    for index, component in enumerate(components):
+        assert component.index == index
+        assert uihierarchy.parents[index] == (component.parent.index if component.parent else -1)
+        assert uihierarchy.depths[index] == (uihierarchy.depths[component.parent.index] + 1 if component.parent else 0)
+        assert uihierarchy.get_subtree(component) == collect(component)
+
+
+def test_package_queries_equal_a_traversal(uihierarchy):
+    components = collect(uihierarchy.root_component)
+    for package in {component.properties.get("package") for component in components} | {"com.example.missing"}:
+        excluded = [(component, component.bounds) for component in components if component.properties.get("package") != package and component.bounds]
+        assert uihierarchy.get_bounds_excluding_package(package) == excluded
+        rows = [component.bounds for component in components if component.bounds and component.properties.get("package") == package]
+        assert uihierarchy.get_package_rows(package) == ((min(b[1] for b in rows), max(b[3] for b in rows)) if rows else None)
+    bounds = [component.bounds for component in components if component.bounds]
+    assert uihierarchy.get_document_dimensions() == (max(b[2] for b in bounds), max(b[3] for b in bounds))
+
+
+def test_containing_components_equal_a_recursive_search(uihierarchy):
+    width, height = uihierarchy.get_document_dimensions()
+    randomizer = random.Random(0)
+    boxes = [(x, y, w, h) for x, y, w, h in (
+        (randomizer.randrange(width), randomizer.randrange(height), randomizer.randrange(1, 200), randomizer.randrange(1, 200)) for _ in range(200)
+    )]
+    boxes += [(b[0], b[1], b[2] - b[0], b[3] - b[1]) for b in (component.bounds for component in uihierarchy.list_all_components()) if b]
+    for x, y, w, h in boxes:
+        expected = searchContaining(uihierarchy.root_component, (x, y, x + w, y + h))
+        assert uihierarchy.find_components_containing_bounds((x, y, w, h)) == expected
+
+
+def test_from_nodes_rebuilds_the_same_index(uihierarchy):
+    components = uihierarchy.list_all_components()
+    nodes = [{"elementName": c.elementName, "sourceLine": c.sourceLine, "properties": c.properties} for c in components]
+    rebuilt = UIHierarchy.from_nodes(uihierarchy.file_path, nodes, uihierarchy.parents, [c.bounds or (-1, -1, -1, -1) for c in components])
+    assert (rebuilt.parents, rebuilt.depths, rebuilt.subtree_ends) == (uihierarchy.parents, uihierarchy.depths, uihierarchy.subtree_ends)
+    assert [c.bounds for c in rebuilt.list_all_components()] == [c.bounds for c in components]
+
+
+def test_deep_hierarchy_is_indexed_without_recursion(tmp_path):
+    depth = 3000
+    xml = tmp_path / "deep.xml"
+    xml.write_text("<?xml version='1.0' encoding='UTF-8' standalone='yes' ?>\n<hierarchy rotation=\"0\">\n" + "".join(
+        f'<node index="0" package="com.example.deep" class="android.view.View" bounds="[0,{level}][100,{depth * 2 - level}]">\n' for level in range(depth)
+    ) + "</node>\n" * depth + "</hierarchy>\n", encoding="utf-8")
+    uihierarchy = UIHierarchy(str(xml))
+    assert len(uihierarchy.list_all_components()) == depth + 1
+    assert uihierarchy.depths[-1] == depth
+    assert uihierarchy.find_components_containing_bounds((10, depth - 1, 5, 2)) == [uihierarchy.list_all_components()[-1]]
+    assert uihierarchy.get_package_rows("com.example.deep") == (0, depth * 2)
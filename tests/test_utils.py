@@ -0,0 +1,43 @@
+import numpy as np
+
+import utils
+
+
+def mergeByPairs(boxes, distance):
+    # Reference: joins every pair of close boxes until no cluster changes, then takes the box of each cluster
+    clusters = [[box] for box in boxes]
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(clusters)):
+            for j in range(i + 1, len(clusters)):
+                if any(utils.are_boxes_close(first, second, distance) for first in clusters[i] for second in clusters[j]):
+                    clusters[i] += clusters.pop(j)
+                    merged = True
+                    break
+            if merged:
+                break
+    result = []
+    for cluster in clusters:
+        x1 = min(box[0] for box in cluster)
+        y1 = min(box[1] for box in cluster)
+        x2 = max(box[0] + box[2] for box in cluster)
+        y2 = max(box[1] + box[3] for box in cluster)
+        result.append((x1, y1, x2 - x1, y2 - y1))
+    return result
+
+
+def test_merge_close_boxes_matches_pairwise_merge():
+    rng = np.random.default_rng(0)
+    for _ in range(300):
+        boxes = [
+            (int(rng.integers(0, 100)), int(rng.integers(0, 100)), int(rng.integers(0, 15)), int(rng.integers(0, 15)))
+            for _ in range(int(rng.integers(0, 12)))
+        ]
+        distance = int(rng.integers(0, 10))
+        assert sorted(utils.merge_close_boxes(boxes, distance)) == sorted(mergeByPairs(boxes, distance))
+
+
+def test_merge_close_boxes_keeps_distant_boxes_apart():
+    assert sorted(utils.merge_close_boxes([(0, 0, 10, 10), (15, 0, 10, 10)], 4)) == [(0, 0, 10, 10), (15, 0, 10, 10)]
+    assert utils.merge_close_boxes([(0, 0, 10, 10), (15, 0, 10, 10)], 5) == [(0, 0, 25, 10)]
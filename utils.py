@@ -1,3 +1,26 @@
+import importlib
+
+class LazyModule:
+  """
+  Stands for a module that is only imported when one of its attributes is first used,
+  so heavy dependencies are not loaded by the code paths that never need them.
+  """
+  def __init__(self, name):
+    self._name = name
+    self._module = None
+
+  def __getattr__(self, attribute):
+    if self._module is None:
+      self._module = importlib.import_module(self._name)
+    return getattr(self._module, attribute)
+
+  def __repr__(self):
+    return f"LazyModule({self._name}, loaded={self._module is not None})"
+
+def lazy_import(name):
+  """Returns a proxy of the named module that imports it on first attribute access."""
+  return LazyModule(name)
+
 def parse_bounds_str(bounds):
     """Parses a bounds string in the format '[x1,y1][x2,y2]' and returns (x1, y1, x2, y2)."""
     import re
@@ -26,3 +49,51 @@ def is_contained(box1, box2):
   x1_2, y1_2, x2_2, y2_2 = box2
 
   return x1_2 <= x1_1 and y1_2 <= y1_1 and x2_2 >= x2_1 and y2_2 >= y2_1
+
+def are_boxes_close(box1, box2, distance):
+  """
+  Checks if the gap between two boxes on both axes is not greater than the given distance.
+  :param box1: Tuple (x, y, w, h) representing the first box.
+  :param box2: Tuple (x, y, w, h) representing the second box.
+  :param distance: Maximum gap, in pixels (0 accepts touching boxes).
+  :return: True if the boxes overlap or are close enough, False otherwise.
+  """
+  x1_1, y1_1, x2_1, y2_1 = convert_bounds_xy(box1)
+  x1_2, y1_2, x2_2, y2_2 = convert_bounds_xy(box2)
+  return x1_2 <= x2_1 + distance and x1_1 <= x2_2 + distance and y1_2 <= y2_1 + distance and y1_1 <= y2_2 + distance
+
+def merge_close_boxes(boxes, distance):
+  """
+  Merges bounding boxes whose gap on both axes is not greater than the given distance.
+  :param boxes: List of tuples (x, y, w, h) representing the boxes to be merged.
+  :param distance: Maximum gap, in pixels, between two boxes of the same cluster.
+  :return: List of tuples (x, y, w, h), one per cluster of boxes.
+  """
+  xy_boxes = sorted(convert_bounds_xy(box) for box in boxes)
+  parent = list(range(len(xy_boxes)))
+
+  def find(i):
+    while parent[i] != i:
+      parent[i] = parent[parent[i]]
+      i = parent[i]
+    return i
+
+  # Boxes are sorted by x1, so the sweep can stop as soon as the horizontal gap is too big
+  for i, (x1_1, y1_1, x2_1, y2_1) in enumerate(xy_boxes):
+    for j in range(i + 1, len(xy_boxes)):
+      x1_2, y1_2, x2_2, y2_2 = xy_boxes[j]
+      if x1_2 > x2_1 + distance:
+        break
+      if y1_2 <= y2_1 + distance and y1_1 <= y2_2 + distance:
+        parent[find(j)] = find(i)
+
+  clusters = {}
+  for i, box in enumerate(xy_boxes):
+    root = find(i)
+    if root in clusters:
+      x1, y1, x2, y2 = clusters[root]
+      clusters[root] = (min(x1, box[0]), min(y1, box[1]), max(x2, box[2]), max(y2, box[3]))
+    else:
+      clusters[root] = box
+
+  return [convert_bounds_wh(box) for box in clusters.values()]